@@ -1,206 +1,284 @@
-from random import uniform, random
-from math import e, sqrt, cos, pi
+from math import pi
 import numpy as np
-import random as random
+from Objective import parallelize
+from Optimizer import Optimizer, SteadyStateOptimizer
 '''
 Class ABC (Artificial Bee colony).
-The porpuose of this class is to optimize an objetive 
+The porpuose of this class is to optimize an objetive
 function accordingly to the artificial bee colony method.
+The colony is stored as arrays with one row per bee: the positions and
+costs of the employed bees, with the tries left before they scout, and
+the positions and costs of the onlooker bees. Every phase draws the
+proposals of all its bees at once and evaluates them as one population.
+The populations asked for are the initial colony, the neighbours of the
+onlooker bees and then, on every iteration, the proposals of the
+employed bees and the neighbours of the onlooker bees.
 '''
-class ABC():
-    '''
-    Class Bee.
-    A Bee is an object that has a position and is capable of evaluating
-    the amount of nectar (cost) of a point.
-    '''
-    class Bee():
-        '''
-        Auxiliary function to get the fitness of a point.
-        Params: 
-            - position: a coordinate. 
-            - fx:  objective function.
-        Returns:
-            - the fitness of the position
-        '''    
-        def get_fitness(self, position, fx):
-            cost = fx(position)
-            if(cost >= 0):
-                return 1/1+cost, cost
-            return 1 + abs(cost), cost
-
-        '''
-        The constructor of the class.
-        Params: 
-            - position: a coordinate. 
-            - fx:  objective function.
-        '''
-        def __init__(self, position, fx) -> None:
-            self.memory = position
-            self.fitness, self.cost = self.get_fitness(self.memory,fx)
-            self.fx = fx
-        
-        '''
-        Function to move the bee randomly around its current position.
-        Params: 
-            - swarm: the bee swarm. 
-            - fx:  objective function.
-            - a:  a hyperparfameter.
-        Returns:
-            - 1 in case the bee changed its position
-            - 0 in other case
-        '''
-        def find_neighbourhood(self, fx, swarm,a):
-            i = random.randint(0,len(swarm)-1)
-            j = random.randint(0,len(self.memory)-1)
-            neighbour = self.memory + random.uniform(-a,a)*(self.memory[j] - swarm[i].memory[j])
-            fitness_neighbour, cost_neighbour = self.get_fitness(neighbour,fx)
-            if(cost_neighbour < self.cost):
-                self.memory = neighbour
-                self.fitness = fitness_neighbour
-                self.cost = cost_neighbour
-                return 1
-            else:
-                return 0
-
-        '''
-        Function to set the new position of a bee.
-        Params: 
-            - position: a coordinate. 
-        '''
-        def set_memory(self, position):
-            self.memory = position
-            self.fitness, self.cost = self.get_fitness(position,self.fx)
+class ABC(Optimizer):
+    '''
+    The constructor of the ABC class.
+    Params:
+        - dimention: the number of dimentions of the objective function.
+        - num_points:  number of employed bees.
+        - bonds:  bounds for the objective function.
+        - numlookers:  number of onlooker bees.
+        - fx (optional):  objective function.
+        - executor (optional): a concurrent.futures executor to evaluate
+        the population in parallel.
+        - n_workers (optional): the number of worker processes of a new
+        pool, when no executor is given.
+        - num_iterations (optional): the number of iterations.
+        - limit (optional): the number of tries for the worker bees before moving.
+        - a (optional):  a hyperparfameter.
+    '''
+    def __init__(self,  dimention, num_points, bonds, numlookers, fx = None, executor = None, n_workers = None,
+        num_iterations = 50, limit = 15, a = pi) -> None:
+        super().__init__(2*num_iterations + 2)
+        self.num_points = num_points
+        self.numlookers = numlookers
+        self.lower = bonds[0]
+        self.upper = bonds[1]
+        self.limit = limit
+        self.a = a
+        self.function = parallelize(fx, executor, n_workers) if fx is not None else None
+        positions = self.random_positions(num_points + numlookers, dimention)
+        self.positions = positions[:num_points]
+        self.costs = None
+        self.tries = np.zeros(num_points, dtype=int)
+        self.onlooker_positions = positions[num_points:]
+        self.onlooker_costs = None
+        self.phase = 'initial'
+        self.scouts = None
 
-        '''
-        Function to return the position of a bee.
-        Returns: 
-            - memory: the current coordinate of the bee. 
-        '''
-        def get_memory(self):
-            return self.memory
+    '''
+    Function to draw random positions in the search space.
+    Params:
+        - number: the number of positions.
+        - dimention: the number of dimentions of the positions.
+    Returns:
+        - a matrix with one random coordinate per row.
+    '''
+    def random_positions(self, number, dimention):
+        return self.lower + np.random.uniform(0, 1, (number, dimention))*(self.upper - self.lower)
 
     '''
-    Class OnlookerBee.
-    An unlooker bee has the ability to comunicate with other bees.
+    Function to draw a random neighbour of every given position. Each
+    neighbour is moved by the difference along a random coordinate
+    between the position and a random employed bee.
+    Params:
+        - positions: a matrix with one coordinate per row.
+        - a:  a hyperparfameter.
+    Returns:
+        - a matrix with the coordinate of every neighbour.
     '''
-    class OnlookerBee(Bee):
+    def get_neighbours(self, positions, a):
+        number, dimention = positions.shape
+        i = np.random.randint(0, self.num_points, number)
+        j = np.random.randint(0, dimention, number)
+        phi = np.random.uniform(-a, a, number)
+        rows = np.arange(number)
+        return positions + (phi*(positions[rows, j] - self.positions[i, j]))[:, None]
 
-        '''
-        The constructor of the class.
-        Params: 
-            - position: a coordinate. 
-            - fx:  objective function.
-        '''
-        def __init__(self,position, fx) -> None:
-            self.fx = fx
-            super().__init__(position,fx)
+    '''
+    Function that draws the proposals of the employed bees. The bees
+    with tries left propose a neighbour, and the other bees scout a
+    random position.
+    Returns:
+        - a matrix with the proposal of every employed bee.
+    '''
+    def propose_employed(self):
+        self.scouts = self.tries >= self.limit
+        proposals = self.get_neighbours(self.positions, self.a)
+        proposals[self.scouts] = self.random_positions(np.count_nonzero(self.scouts), self.positions.shape[1])
+        return proposals
 
-        '''
-        A method that comunicates the onlooker bees 
-        with the other bees in the swarm.
-        Params: 
-            - swarm: the bee swarm. 
-            - a:  a hyperparfameter.
-        '''
-        def comunicate(self, swarm, a):
-            population_fitness = sum([bee.cost for bee in swarm])
-            bees_probabilities = [bee.cost/population_fitness for bee in swarm]
-            bee = np.random.choice(swarm, p=bees_probabilities)
-            self.memory = bee.memory
-            self.cost = bee.cost
-            self.fitness = bee.fitness
-            super().find_neighbourhood(self.fx, swarm, a)
+    '''
+    Function that moves the employed bees to their proposals if they
+    improve their cost, and the scouts to their random positions.
+    Params:
+        - proposals: the proposal of every employed bee.
+        - costs: the cost of every proposal.
+    '''
+    def settle_employed(self, proposals, costs):
+        improved = (costs < self.costs) | self.scouts
+        self.positions[improved] = proposals[improved]
+        self.costs[improved] = costs[improved]
+        self.tries[~improved] += 1
+        self.tries[self.scouts] = 0
 
     '''
-    Class OnlookerBee.
-    An unlooker bee has the ability to comunicate with other bees.
-    '''
-    class EmployedBee(Bee):
-        
-        '''
-        The constructor of the class.
-        Params: 
-            - position: a coordinate. 
-            - lower:  lower bound of the search space.
-            - upper:  upper bound of the search space.
-            - fx:  objective function.
-        '''
-        def __init__(self,position, lower, upper, fx) -> None:
-            super().__init__(position, fx)
-            self.fx = fx
-            self.lower = lower
-            self.upper = upper
-            self.tries = 0
+    Function that draws the neighbours of the onlooker bees. Every
+    onlooker goes to an employed bee chosen with probability proportional
+    to its cost, all of them with a single draw from a distribution
+    computed once, and proposes a neighbour of it.
+    Returns:
+        - a matrix with the neighbour of every onlooker bee.
+    '''
+    def propose_onlookers(self):
+        probabilities = self.costs/np.sum(self.costs)
+        chosen = np.random.choice(self.num_points, size=self.numlookers, p=probabilities)
+        self.onlooker_positions = self.positions[chosen]
+        self.onlooker_costs = self.costs[chosen]
+        return self.get_neighbours(self.onlooker_positions, self.a)
 
-        '''
-        A method that attemps to move the bee to a better
-        neighbourhood.
-        Params: 
-            - limit: the number of tries for the worker bees before moving.
-            - swarm: the bee swarm.  
-            - a:  a hyperparfameter.
-        '''
-        def move(self, limit, swarm, a):
-            if(self.tries < limit):
-                gain = super().find_neighbourhood( self.fx, swarm, a)
-                if(gain == 0):
-                    self.tries += 1
-            else:
-                self.tries = 0
-                self.scout()
+    '''
+    Function that moves the onlooker bees to their neighbours if they
+    improve their cost.
+    Params:
+        - neighbours: the neighbour of every onlooker bee.
+        - costs: the cost of every neighbour.
+    '''
+    def settle_onlookers(self, neighbours, costs):
+        improved = costs < self.onlooker_costs
+        self.onlooker_positions[improved] = neighbours[improved]
+        self.onlooker_costs[improved] = costs[improved]
 
-        '''
-        A method that moves a bee to a random new position.
-        '''
-        def scout(self):
-            super().set_memory(np.array([self.lower + random.uniform(0, 1)*(self.upper-self.lower) for _ in range(0, len(super().get_memory()))]))
+    '''
+    Function that draws the population of the current phase.
+    Returns:
+        - a matrix with one coordinate per row.
+    '''
+    def propose(self):
+        if(self.phase == 'initial'):
+            return np.vstack([self.positions, self.onlooker_positions])
+        if(self.phase == 'employed'):
+            return self.propose_employed()
+        return self.propose_onlookers()
 
     '''
-    The constructor of the ABC class.
-    Params: 
-        - dimention: the number of dimentions of the objective function. 
-        - num_points:  number of employed bees.
-        - bonds:  bounds for the objective function.
-        - numlookers:  number of onlooker bees.
-        - fx:  objective function.
+    Function that moves the bees of the current phase with the costs
+    of their population, and passes to the next phase.
+    Params:
+        - values: the cost of every coordinate of the population.
     '''
-    def __init__(self,  dimention, num_points, bonds, numlookers, fx) -> None:
-        self.num_points = num_points
-        self.fx = fx
-        self.swarm = [self.EmployedBee(np.array([bonds[0] + random.uniform(0, 1)*(bonds[1]-bonds[0]) for _ in range(0, dimention)]), bonds[0], bonds[1], fx) for _ in range(0, num_points)]
-        self.unlooker_bees = [self.OnlookerBee(np.array([bonds[0] + random.uniform(0, 1)*(bonds[1]-bonds[0]) for _ in range(0, dimention)]), fx) for _ in range(0, numlookers)]
-    
+    def update(self, values):
+        if(self.phase == 'initial'):
+            self.costs = values[:self.num_points]
+            self.onlooker_costs = values[self.num_points:]
+            self.phase = 'onlooker'
+        elif(self.phase == 'employed'):
+            self.settle_employed(self.candidates, values)
+            self.phase = 'onlooker'
+        else:
+            self.settle_onlookers(self.candidates, values)
+            self.phase = 'employed'
+
     '''
     Function that executes the ABC method.
-    Params: 
-        - num_iterations: the number of iterations. 
+    The proposals of the employed bees and of the onlooker bees are
+    evaluated as one population per phase.
+    Params:
+        - num_iterations: the number of iterations.
         - limit: the number of tries for the worker bees before moving.
         - a:  a hyperparfameter.
     '''
     def run(self, num_iterations, limit, a):
-        def find_best():
-            best_bee = self.swarm[0]
-            best_cost = self.fx(best_bee.memory)
-            for workerbee in self.swarm:
-                cost_bee = workerbee.cost
-                if(cost_bee < best_cost):
-                    best_cost = cost_bee
-                    best_bee = workerbee
-            for unlookerbee in self.swarm:
-                cost_bee = unlookerbee.cost
-                if(cost_bee < best_cost):
-                    best_cost = cost_bee
-                    best_bee = unlookerbee
-            return best_bee
-        for unlookerbee in self.unlooker_bees:
-            unlookerbee.comunicate(self.swarm,a )
-        best_bee = find_best()
-        for _ in range(0, num_iterations):
-            for workerbee in self.swarm:
-                workerbee.move( limit, self.swarm, a)
-            for unlookerbee in self.unlooker_bees:
-                unlookerbee.comunicate(self.swarm,a)
-            act_best = find_best()
-            if(act_best.cost < best_bee.cost):
-                best_bee = act_best      
-        return best_bee.memory
\ No newline at end of file
+        self.limit = limit
+        self.a = a
+        self.max_iterations = 2*num_iterations + 2
+        return self.optimize().x
+
+'''
+Class SteadyStateABC.
+An artificial bee colony that updates its food sources as soon as the
+cost of any trial arrives. After the initial sources are handed out, the
+trials alternate between an employed bee, that takes the sources in
+turn and scouts the ones that ran out of tries, and an onlooker bee,
+that picks a source with probability proportional to its cost at that
+moment. Both kinds of trial replace their source when they improve it.
+'''
+class SteadyStateABC(SteadyStateOptimizer):
+    '''
+    The constructor of the class.
+    Params:
+        - dimention: the number of dimentions of the objective function.
+        - num_points:  number of food sources.
+        - bonds:  bounds for the objective function.
+        - limit (optional): the number of tries for the worker bees before moving.
+        - a (optional):  a hyperparfameter.
+        - max_evaluations (optional): the number of trials to evaluate.
+    '''
+    def __init__(self, dimention, num_points, bonds, limit = 15, a = pi, max_evaluations = 2000) -> None:
+        super().__init__(max_evaluations, num_points)
+        self.num_points = num_points
+        self.lower = bonds[0]
+        self.upper = bonds[1]
+        self.limit = limit
+        self.a = a
+        self.positions = self.random_positions(num_points, dimention)
+        self.costs = np.full(num_points, np.inf)
+        self.tries = np.zeros(num_points, dtype=int)
+        self.next_source = 0
+        self.onlooker_turn = False
+
+    '''
+    Function to draw random positions in the search space.
+    Params:
+        - number: the number of positions.
+        - dimention: the number of dimentions of the positions.
+    Returns:
+        - a matrix with one random coordinate per row.
+    '''
+    def random_positions(self, number, dimention):
+        return self.lower + np.random.uniform(0, 1, (number, dimention))*(self.upper - self.lower)
+
+    '''
+    Function to draw a random neighbour of a source, moved by the
+    difference along a random coordinate between the source and another
+    evaluated source.
+    Params:
+        - source: the index of the source.
+        - evaluated: the indices of the evaluated sources.
+    Returns:
+        - the coordinate of the neighbour.
+    '''
+    def get_neighbour(self, source, evaluated):
+        i = np.random.choice(evaluated)
+        j = np.random.randint(0, self.positions.shape[1])
+        phi = np.random.uniform(-self.a, self.a)
+        return self.positions[source] + phi*(self.positions[source, j] - self.positions[i, j])
+
+    '''
+    Function that draws the next trial: an initial source, a trial of an
+    employed bee or a trial of an onlooker bee.
+    Returns:
+        - tuple: the kind of the trial and the index of its source.
+        - the coordinate of the trial.
+    '''
+    def propose_one(self):
+        if(self.asked <= self.num_points):
+            source = self.asked - 1
+            return ('initial', source), self.positions[source].copy()
+        evaluated = np.flatnonzero(np.isfinite(self.costs))
+        if(self.onlooker_turn and len(evaluated) > 0):
+            self.onlooker_turn = False
+            probabilities = self.costs[evaluated]/np.sum(self.costs[evaluated])
+            source = np.random.choice(evaluated, p=probabilities)
+            return ('onlooker', source), self.get_neighbour(source, evaluated)
+        self.onlooker_turn = True
+        source = self.next_source
+        self.next_source = (self.next_source + 1) % self.num_points
+        if(self.tries[source] >= self.limit or len(evaluated) == 0):
+            return ('scout', source), self.random_positions(1, self.positions.shape[1])[0]
+        return ('employed', source), self.get_neighbour(source, evaluated)
+
+    '''
+    Function that updates the source of a trial with its cost.
+    Params:
+        - key: the kind of the trial and the index of its source.
+        - position: the coordinate of the trial.
+        - value: the cost of the trial.
+    '''
+    def update_one(self, key, position, value):
+        kind, source = key
+        if(kind == 'initial' or kind == 'scout'):
+            if(kind == 'scout' or value < self.costs[source]):
+                self.positions[source] = position
+                self.costs[source] = value
+            self.tries[source] = 0
+        elif(value < self.costs[source]):
+            self.positions[source] = position
+            self.costs[source] = value
+            self.tries[source] = 0
+        else:
+            self.tries[source] += 1
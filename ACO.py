@@ -1,310 +1,341 @@
-from random import random, uniform
-from scipy.optimize import minimize
-from math import e, sqrt,cos,pi
+from collections import deque
+from math import pi
+import numpy as np
+from Objective import evaluate_population
+from Optimizer import Optimizer, StoppingCriteria, minimize_stopping
 
 '''
-Class Point.
-A point is an object that has a position and a pheromone that leads
-to the point.
-'''
-class Point():
-    '''
-    The constructor of the class.
-    Params: 
-        - point: a coordinate. 
-        - pheromone:  the pheromone that leads to the point.
-    '''
-    def __init__(self, point, pheromone) -> None:
-        self.point = point
-        self.pheromone = pheromone
-    
-    '''
-    Method to get the coordinates of the point.
-    Return: 
-        - point: The coordinates of the point.
-    '''
-    def get_point(self):
-        return self.point
-    
-    '''
-    Method to get the pheromone of the point.
-    Return: 
-        - point: The pheromone of the point.
-    '''
-    def get_pheromone(self):
-        return self.pheromone
-
-    '''
-    Method to set the pheromone of the point.
-    Params: 
-        - pheromone: The pheromone of the point.
-    '''
-    def set_pheromone(self, pheromone):
-        self.pheromone = pheromone
-    
-    '''
-    Method to set a coordinate of the point.
-    Params: 
-        - point: The coordinate of the point.
-    '''
-    def set_point(self, point):
-        self.point = point
-
-    '''
-    Method that returns the string representation of the point.
-    Return: 
-        - string: the string representation of the point.
-    '''
-    def __str__(self):
-        return "point: " + str(self.point) + "," + "pheromone: " + str(self.pheromone)
-'''
-Class Ant.
-An ant is an object that has a position, a memory and a limit for it's memory.
-An ant can move, forget/remember previous visited places and return it's location.
+Class ACO.
+Class to run the ant colony optimization with respect of the
+given function.
+The discrete points of every dimention and the pheromone that leads to
+each of them are stored as (num_params, discrete_points) arrays, and the
+location of every ant is a row of indices into them, so the whole colony
+is built with array operations. Every ant remembers its last visited
+points, one (dimention, point) pair per entry, in a boolean mask that
+can be checked in constant time.
+After the colony is built, the best ants are refined by a local search,
+a pluggable function that receives the objective, the location and the
+cost of an ant, a number of evaluations and the seconds that it may
+spend. The evaluations spent building the colony and in the local
+search are counted apart, and the local search can be given a budget
+for the whole run. The local search also keeps within the evaluations
+and the deadline of the StoppingCriteria of the optimization.
+Every population asked for is a new colony. The local search needs to
+evaluate the objective by itself, so it only runs when the optimizer
+knows an objective function: the one given to optimize, or local_fx.
 '''
-class Ant():
+class ACO(Optimizer):
     '''
     The constructor of the class.
-    Params: 
-        - memory_limit: the maximum number of previous visited placed that an
-        ant can remember.
-    '''
-    def __init__(self, memory_limit) -> None:
-        self.memory = list()
-        self.memory_limit = memory_limit
-        self.current_localization = list()
-    '''
-    Method to clear the ant location.
-    '''
-    def clear_location(self):
-        self.current_localization = list()
-
-    '''
-    Method to get the coordinates of the ant location.
-    Return: 
-        - list: the list of coordinates of the ant position.
-    '''
-    def get_location(self):
-        output_list = list()
-        for point in self.current_localization:
-            output_list.append(point.get_point())
-        return output_list
-
-    '''
-    Method to update the position of the ant.
-    Params: 
-        - new_location: a list that contains the coordinates of the
-        new location.
-    '''
-    def update_location(self, new_location):
-        for i in range(len(self.current_localization)):
-            self.current_localization[i].set_point(new_location[i])
-
-    '''
-    Method that adds a point to the list that contains
-    the location of the ant.
-    '''
-    def assign_point(self, point):
-        self.current_localization.append(point)
-
-    '''
-    Method that updates the pheromone of the current location
-    point of the ant.
-    Params: 
-        - error: The error induced by the best solution in the colony.
-    '''
-    def update_pheromone(self, error):
-        for point in self.current_localization:
-            point.set_pheromone(point.get_pheromone() + (1/error))
+    Params:
+        - num_params: the number of dimentios of the objective function.
+        - discrete_points: the number of discrete points to sample.
+        - interval: an interval to draw number from.
+        - number_ants: The number of ants of the colony.
+        - q: A constant.
+        - evaporation_rate: A constant to control the evaporation of the pheromone.
+        - num_iterations (optional): The number of iterations of the algorithm.
+        - local_search (optional): the local search function, like
+        cobyla_search, gradient_search or pattern_search, or None to
+        skip the local search.
+        - top_k (optional): the number of best ants refined on every
+        iteration. Every ant is refined when it is not given.
+        - local_evaluations (optional): the evaluations that the local
+        search may spend on a single ant.
+        - local_budget (optional): the evaluations that the local search
+        may spend during the whole run.
+        - local_fx (optional): the objective function of the local search,
+        when it is not the one of the colony, like one that also returns
+        the gradient.
+    '''
+    def __init__(self, num_params, discrete_points, interval, number_ants, q, evaporation_rate, num_iterations = 50,
+        local_search = None, top_k = None, local_evaluations = None, local_budget = None, local_fx = None) -> None:
+        super().__init__(num_iterations + 1)
+        self.number_params = num_params
+        self.num_iterations = num_iterations
+        self.discrete_points = discrete_points
+        self.number_ants = number_ants
+        self.q = q
+        self.p = evaporation_rate
+        half = discrete_points // 2
+        self.points = np.hstack([np.random.uniform(0, pi, (num_params, half)),
+            np.random.uniform(0, 2*pi, (num_params, discrete_points - half))])
+        self.pheromones = np.full((num_params, discrete_points), 1/2)
+        self.locations = np.zeros((number_ants, num_params), dtype=int)
+        self.memory = np.zeros((number_ants, num_params, discrete_points), dtype=bool)
+        self.memory_order = [deque() for _ in range(0, number_ants)]
+        self.memory_limit = num_params
+        self.refiner = local_search
+        self.top_k = top_k if top_k is not None else number_ants
+        self.local_evaluations = local_evaluations if local_evaluations else 2*num_params + 1
+        self.local_budget = local_budget
+        self.local_fx = local_fx
+        self.local_search_evaluations = 0
 
     '''
-    Method to save a new location in the ant memory.
-    Params: 
-        - point: the point that will be saved in the ant memory
+    Method to save a new location in the memory of an ant.
+    Params:
+        - ant: the index of the ant.
+        - dimention: the dimention of the point.
+        - point: the index of the point.
     Return:
         - True: if the point was added to the memory and False otherwise.
     '''
-    def set_memory(self, point):
-        for p in self.memory:
-            if(point.get_point() == p.get_point()): 
-                return False
-        self.memory.append(point)
-        if( len(self.memory) > self.memory_limit ):
-            del self.memory[0]
+    def set_memory(self, ant, dimention, point):
+        if(self.memory[ant, dimention, point]):
+            return False
+        self.memory[ant, dimention, point] = True
+        self.memory_order[ant].append((dimention, point))
+        if(len(self.memory_order[ant]) > self.memory_limit):
+            forgotten = self.memory_order[ant].popleft()
+            self.memory[ant, forgotten[0], forgotten[1]] = False
         return True
 
     '''
-    Method that returns the string representation of the bat.
-    Return: 
-        - string: the string representation of the bat.
-    '''
-    def __str__(self):
-        memory = ""
-        for point in self.memory:
-            memory += " " + str(point) + " "
-        location = ""
-        for point in self.current_localization:
-            location += " " + str(point) + " "
-        return "memory: " + memory + " and " + "current location" + location
+    Method to get the coordinates of the location of the ants.
+    Params:
+        - ant (optional): the index of an ant.
+    Return:
+        - numpy array: the coordinates of the ant, or a matrix with one
+        row per ant when no ant is given.
+    '''
+    def get_location(self, ant = None):
+        dimentions = np.arange(self.number_params)
+        if(ant is None):
+            return self.points[dimentions, self.locations]
+        return self.points[dimentions, self.locations[ant]]
 
-'''
-Class PointList.
-A list that contains points.
-'''
-class PointsList():
-    '''
-    The constructor of the class.
-    Params: 
-        - list_of_points: the list of points.
-    '''
-    def __init__(self, list_of_points) -> None:
-        self.points = list_of_points
-    
     '''
-    Method that returns the point object that has the higher pheromone.
-    Return: 
-        - Point: the point with the higher pheromone trail.
+    Method to update the position of an ant, moving the points of its
+    location to the new coordinates.
+    Params:
+        - ant: the index of the ant.
+        - new_location: a list that contains the coordinates of the
+        new location.
     '''
-    def get_best_point(self):
-        best_point = Point(0,0)
-        for point in self.points:
-            if(point.get_pheromone() > best_point.get_pheromone()):
-                best_point = point
-        return best_point
+    def update_location(self, ant, new_location):
+        self.points[np.arange(self.number_params), self.locations[ant]] = new_location
 
     '''
-    Method that returns the sum of the pheromones of the list of points.
-    Return: 
-        - float: the total pf pheromones.
-    '''
-    def get_total_pheromones(self):
-        total = 0
-        for point in self.points:
-            total += point.get_pheromone()
-        return total
+    Method that does a local search around the location of the top_k
+    best ants, within the budget of evaluations that is left and what is
+    left of the evaluations and the time of the stopping criteria.
+    Params:
+        - function: the objective function of the local search.
+        - locations: the location of every ant, one per row.
+        - costs: the cost of every ant.
+    Return:
+        - numpy array: the locations, with the refined ones replaced.
+        - numpy array: the costs, with the refined ones replaced.
+    '''
+    def local_search(self, function, locations, costs):
+        if(self.refiner is None):
+            return locations, costs
+        locations = locations.copy()
+        costs = np.array(costs, dtype=float)
+        for ant in np.argsort(costs)[:self.top_k]:
+            evaluations = self.local_evaluations
+            if(self.local_budget is not None):
+                evaluations = min(evaluations, self.local_budget - self.local_search_evaluations)
+            deadline = None
+            if(self.stopping is not None):
+                evaluations_left, deadline = self.stopping.get_remaining(self.get_evaluations())
+                if(evaluations_left is not None):
+                    evaluations = min(evaluations, evaluations_left)
+                if(deadline is not None and deadline <= 0):
+                    break
+            if(evaluations <= 0):
+                break
+            location, cost, spent = self.refiner(function, locations[ant], costs[ant], evaluations, deadline)
+            self.local_search_evaluations += spent
+            if(cost < costs[ant]):
+                locations[ant] = location
+                costs[ant] = cost
+                self.update_location(ant, location)
+        return locations, costs
 
     '''
-    Method that returns the list of points.
-    Return: 
-        - list: the the list of points.
+    Method that updates the pheromone of the location of an ant and
+    evaporates the pheromones of every point.
+    Params:
+        - ant: the index of the ant.
+        - cost: the error induced by the best solution in the colony.
     '''
-    def get_list_points(self):
-        return self.points
+    def update_pheromone(self, ant, cost):
+        self.pheromones[np.arange(self.number_params), self.locations[ant]] += 1/cost
+        self.pheromones *= (1 - self.p)
 
     '''
-    Method that evaporates the pheromones in the points.
+    Method in which the ants in the colony decides to move to a location
+    based on the pheromone trail or on a probabilistic desition.
+    The greedy ants take the point with the most pheromone of every
+    dimention. The other ants go through the points of every dimention
+    in order, and accept each point that is not in their memory with
+    probability one minus its share of the pheromone of the dimention.
+    The points of the whole colony are drawn at once for every dimention.
     '''
-    def evaporate_pheromone(self, p):
-        for point in self.points:
-            point.set_pheromone((1-p)*point.get_pheromone())
+    def probabilistic_construction(self):
+        greedy = np.random.random(self.number_ants) > 1 - self.q
+        best_points = np.argmax(self.pheromones, axis=1)
+        shares = self.pheromones / np.sum(self.pheromones, axis=1, keepdims=True)
+        for dimention in range(0, self.number_params):
+            accepted = np.random.random((self.number_ants, self.discrete_points)) > shares[dimention]
+            accepted &= ~self.memory[:, dimention, :]
+            chosen = np.where(accepted.any(axis=1), np.argmax(accepted, axis=1), best_points[dimention])
+            chosen[greedy] = best_points[dimention]
+            self.locations[:, dimention] = chosen
+            for ant in range(0, self.number_ants):
+                self.set_memory(ant, dimention, chosen[ant])
 
-'''
-Class ACO.
-Class to run the ant colony optimization with respect of the
-given function.
-'''
-class ACO():
-    '''
-    The constructor of the class.
-    Params: 
-        - num_params: the number of dimentios of the objective function.
-        - discrete_points: the number of discrete points to sample.
-        - interval: an interval to draw number from.
-        - number_ants: The number of ants of the colony.
-        - q: A constant.
-        - evaporation_rate: A constant to control the evaporation of the pheromone.
-        - num_iterations (optional): The number of iterations of the algorithm.
     '''
-    def __init__(self, num_params, discrete_points, interval, number_ants, q, evaporation_rate, num_iterations = 50) -> None:
-        def first_guess_linear(n):
-            [Point(uniform(interval[0],interval[1]), 1/2) for _ in range(discrete_points)]
-            theta = [Point(uniform(0, pi),1/2) for _ in range(0,int(n/2))] + [Point(uniform(0, 2*pi),1/2) for _ in range(0,int(n/2))]
-            return (theta)
-        self.number_params = num_params
-        self.num_iterations = num_iterations
-        self.discrete_points = discrete_points
-        self.points = list()
-        self.q = q
-        self.p = evaporation_rate
-        self.ants = [Ant(num_params) for _ in range(0, number_ants)]
-        for _ in range(0,self.number_params):
-            self.points.append(PointsList(first_guess_linear(discrete_points)))
+    Method that places known points among the discrete points of every
+    dimention, with more pheromone than the random ones, so that the
+    greedy ants start from them.
+    Params:
+        - points: a matrix with one point per row.
+    '''
+    def seed(self, points):
+        if(len(points) == 0):
+            return
+        points = np.asarray(points, dtype=float)[:self.discrete_points]
+        self.points[:, :len(points)] = points.T
+        self.pheromones[:, :len(points)] = 1
 
     '''
-    Method that returns the best ant and it's cost 
-    with respect to the cost function.
-    Return: 
-        - Ant: the best ant in the colony.
-        - float: the cost of the best ant.
+    Method that builds a new colony.
+    Return:
+        - numpy array: the location of every ant, one per row.
     '''
-    def get_best_ant(self, function):
-        best_ant = self.ants[0]
-        cost = function(best_ant.get_location())
-        for ant in self.ants:
-            ant_cost = (function(ant.get_location()))
-            if(ant_cost < cost):
-                cost = ant_cost
-                best_ant = ant
-        return best_ant, cost
+    def propose(self):
+        self.probabilistic_construction()
+        return self.get_location()
 
     '''
-    Method that does a local search around the current position
-    of an ant.
-    '''
-    def local_search(self, function):
-        for ant in self.ants:
-            res = minimize(function, ant.get_location(), method='COBYLA', options={"maxiter":5})
-            ant.update_location(res.x)
+    Method that refines the best ants of the evaluated colony and lays
+    pheromone on the location of the best one.
+    Params:
+        - values: the cost of every ant.
+    '''
+    def update(self, values):
+        local_fx = self.local_fx if self.local_fx is not None else self.function
+        locations, costs = self.candidates, values
+        if(local_fx is not None):
+            locations, costs = self.local_search(local_fx, locations, costs)
+            self.record(locations, costs)
+        ant = int(np.argmin(costs))
+        self.update_pheromone(ant, costs[ant])
 
     '''
-    Method that updates the pheromone of the ants in the colony.
+    Method that gets the number of evaluations spent by the colony and
+    by the local search.
+    Return:
+        - int: the number of evaluations.
     '''
-    def update_pheromone(self, ant, cost):
-        ant.update_pheromone(cost)
-        for point_list in self.points:
-            point_list.evaporate_pheromone(self.p)
+    def get_evaluations(self):
+        return self.evaluations + self.local_search_evaluations
 
     '''
-    Method in which the ants in the colony decides to move to a location
-    based on the pheromone trail or on a probabilistic desition.
+    Method that gets the result of the optimization, with the
+    evaluations spent in the local search counted apart.
+    Return:
+        - OptimizeResult: the result of the optimization.
     '''
-    def probabilistic_construction(self):
-        for ant in self.ants:
-            ant.clear_location()
-            if(random() > 1 - self.q):
-                for point_list in self.points:
-                    ant_asigned = ant.set_memory(point_list.get_best_point())
-                    ant.assign_point(point_list.get_best_point())
-            else:
-                for point_list in self.points:
-                    for point in point_list.get_list_points():
-                        if(random() > (point.get_pheromone())/point_list.get_total_pheromones()):
-                            ant_asigned = ant.set_memory(point)
-                            if (ant_asigned):
-                                ant.assign_point(point)
-                                break
+    def get_result(self):
+        result = super().get_result()
+        result.local_search_evaluations = self.local_search_evaluations
+        return result
 
     '''
     Method to run the PSO heuristic over the objective function.
-    Params: 
+    Every iteration builds the colony, evaluates it, refines the best
+    ants and lays pheromone on the location of the best one.
+    Params:
         - fx: the cost function.
-    Return: 
+        - executor (optional): a concurrent.futures executor to evaluate
+        the colony in parallel.
+        - n_workers (optional): the number of worker processes of a new
+        pool, when no executor is given.
+    Return:
         -list: a list with the best point find by the colony.
         -float: the cost of the best point found by the colony.
     '''
-    def run(self,fx):
-        self.probabilistic_construction()
-        self.local_search(fx)
-        best_ant, best_cost = self.get_best_ant(fx)
-        best_location = best_ant.get_location()
-        self.update_pheromone(best_ant, best_cost)
-        for i in range(self.num_iterations):
-            self.probabilistic_construction()
-            self.local_search(fx)
-            ant, cost = self.get_best_ant(fx)
-            self.update_pheromone(ant, cost)
-            if(cost < best_cost):
-                best_location = ant.get_location()
-                best_ant = ant
-                best_cost = cost
-        return [best_location,self.num_iterations]
\ No newline at end of file
+    def run(self,fx, executor = None, n_workers = None):
+        result = self.optimize(fx, executor, n_workers)
+        return [list(result.x),self.num_iterations]
+
+'''
+Function that refines a location with a few iterations of COBYLA.
+Params:
+    - function: the objective function.
+    - location: the coordinates of the location.
+    - cost: the cost of the location.
+    - max_evaluations: the evaluations that the search may spend.
+    - deadline (optional): the seconds that the search may spend.
+Return:
+    - numpy array: the refined location.
+    - float: the cost of the refined location.
+    - int: the evaluations spent.
+'''
+def cobyla_search(function, location, cost, max_evaluations, deadline = None):
+    if(max_evaluations < len(location) + 2):
+        return location, cost, 0
+    stopping = StoppingCriteria(deadline=deadline, max_evaluations=max_evaluations)
+    res = minimize_stopping(function, location, stopping, method='COBYLA', options={"maxiter":max_evaluations})
+    return res.x, res.fun, res.nfev
+
+'''
+Function that refines a location with L-BFGS-B, for objective functions
+that return the cost together with its gradient. The maxfun option of
+L-BFGS-B is only checked between iterations, so the search is stopped
+by a StoppingCriteria as soon as it spends its evaluations or its time.
+Params:
+    - function: the objective function, that returns the cost and the gradient.
+    - location: the coordinates of the location.
+    - cost: the cost of the location.
+    - max_evaluations: the evaluations that the search may spend.
+    - deadline (optional): the seconds that the search may spend.
+Return:
+    - numpy array: the refined location.
+    - float: the cost of the refined location.
+    - int: the evaluations spent.
+'''
+def gradient_search(function, location, cost, max_evaluations, deadline = None):
+    if(max_evaluations < 1):
+        return location, cost, 0
+    stopping = StoppingCriteria(deadline=deadline, max_evaluations=max_evaluations)
+    res = minimize_stopping(function, location, stopping, method='L-BFGS-B', jac=True, options={"maxfun":max_evaluations})
+    return res.x, res.fun, res.nfev
+
+'''
+Function that refines a location with a compass search, that evaluates
+the steps along every coordinate as one population, so it profits from
+the objective functions that evaluate populations in batches.
+Params:
+    - function: the objective function.
+    - location: the coordinates of the location.
+    - cost: the cost of the location.
+    - max_evaluations: the evaluations that the search may spend.
+    - deadline (optional): the seconds that the search may spend.
+    - step (optional): the initial length of the steps.
+Return:
+    - numpy array: the refined location.
+    - float: the cost of the refined location.
+    - int: the evaluations spent.
+'''
+def pattern_search(function, location, cost, max_evaluations, deadline = None, step = 0.1):
+    location = np.asarray(location, dtype=float)
+    directions = np.vstack([np.eye(len(location)), -np.eye(len(location))])
+    stopping = StoppingCriteria(deadline=deadline)
+    spent = 0
+    while(spent + len(directions) <= max_evaluations and stopping.check(cost, spent, iteration=False) is None):
+        candidates = location + step*directions
+        costs = evaluate_population(function, candidates)
+        spent += len(candidates)
+        best = int(np.argmin(costs))
+        if(costs[best] < cost):
+            location = candidates[best]
+            cost = costs[best]
+        else:
+            step /= 2
+    return location, cost, spent
@@ -0,0 +1,64 @@
+import numpy as np
+'''
+Class AnalyticQAOA.
+An evaluator of the expectation of the p=1 QAOA circuit of a max cut
+instance that uses the closed form of <Z_u Z_v> for every edge (u, v).
+For the circuit exp(-i*beta*sum(X)) exp(-i*gamma*sum(ZZ)) H it is
+
+    <Z_u Z_v> = sin(4b)/2 * sin(2g) * (cos(2g)^d_u + cos(2g)^d_v)
+              - sin(2b)^2/2 * cos(2g)^(d_u + d_v - 2f) * (cos(4g)^f - 1)
+
+where d_u and d_v are the degrees of u and v without counting the edge
+itself and f is the number of common neighbours of u and v. It only
+depends on the graph through these three numbers, so the evaluation
+takes O(|E|) time after an O(|E|*d) preprocessing, without simulating
+the 2^n amplitudes of the circuit.
+'''
+class AnalyticQAOA():
+    '''
+    The constructor of the class.
+    Params:
+        - graph: The graph of which we want the max cut.
+    '''
+    def __init__(self, graph) -> None:
+        degrees_u = list()
+        degrees_v = list()
+        triangles = list()
+        for u, v in graph.edges():
+            neighbours_u = set(graph[u]) - {v}
+            neighbours_v = set(graph[v]) - {u}
+            degrees_u.append(len(neighbours_u))
+            degrees_v.append(len(neighbours_v))
+            triangles.append(len(neighbours_u & neighbours_v))
+        self.degrees_u = np.array(degrees_u)
+        self.degrees_v = np.array(degrees_v)
+        self.triangles = np.array(triangles)
+
+    '''
+    Method that gets <Z_u Z_v> for every edge of the graph.
+    Params:
+        - gamma: the angle of the cost layer, or an array of angles.
+        - beta: the angle of the mixer layer, or an array of angles.
+    Returns:
+        - numpy array: the correlation of every edge, with one row per
+        angle when arrays of angles are given.
+    '''
+    def get_correlations(self, gamma, beta):
+        gamma = np.asarray(gamma, dtype=float)[..., None]
+        beta = np.asarray(beta, dtype=float)[..., None]
+        cos_gamma = np.cos(2*gamma)
+        first = np.sin(4*beta)/2 * np.sin(2*gamma) * (cos_gamma**self.degrees_u + cos_gamma**self.degrees_v)
+        second = np.sin(2*beta)**2/2 * cos_gamma**(self.degrees_u + self.degrees_v - 2*self.triangles) * (np.cos(4*gamma)**self.triangles - 1)
+        return first - second
+
+    '''
+    Method that gets the expected cost of the p=1 QAOA state.
+    Params:
+        - gamma: the angle of the cost layer, or an array of angles.
+        - beta: the angle of the mixer layer, or an array of angles.
+    Returns:
+        - float: the expected cost, or a numpy array with one expected
+        cost per pair of angles.
+    '''
+    def get_expectation(self, gamma, beta):
+        return -np.sum(1 - self.get_correlations(gamma, beta), axis=-1)/2
@@ -0,0 +1,285 @@
+'''
+Batch solver that runs the optimize_* methods of MaxCutSolver over many
+graph files on a pool of worker processes. Every pair of a graph and a
+method is a job, and the result of every job is appended as a JSON line
+to the results file as soon as it finishes, so an interrupted batch is
+resumed by running it again: the jobs already in the results file are
+skipped.
+
+Usage:
+    python BatchSolver.py graphs/ --methods cobyla swarm --p 2 \\
+        --output results.jsonl --workers 8
+    find graphs -name '*.graphml' | python BatchSolver.py - --output results.jsonl
+'''
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import networkx as nx
+import numpy as np
+from numpy import pi
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from MaxCutSolver import MaxCutSolver
+
+'''
+The methods of the batch, each one a function that receives the solver
+and returns the OptimizeResult of the method.
+'''
+METHODS = {
+    "nelder-mead": lambda solver: solver.optimize_classic(method='Nelder-Mead'),
+    "cobyla": lambda solver: solver.optimize_classic(method='COBYLA'),
+    "slsqp": lambda solver: solver.optimize_classic(method='SLSQP'),
+    "swarm": lambda solver: solver.optimize_swarm([0, pi]),
+    "bats": lambda solver: solver.optimize_bats([0, pi]),
+    "ants": lambda solver: solver.optimize_ants([0, pi]),
+    "bees": lambda solver: solver.optimize_bees([0, 2*pi]),
+}
+
+'''
+Function to read a graph file in the node-link JSON format of networkx.
+Params:
+    - path: the path of the file.
+Returns:
+    - Graph: the graph.
+'''
+def read_json_graph(path):
+    with open(path) as graph_file:
+        return nx.node_link_graph(json.load(graph_file))
+
+'''
+The extensions of the graph files, with the function that reads each format.
+The other files are read as edge lists of integer nodes.
+'''
+READERS = {
+    ".graphml": nx.read_graphml,
+    ".gml": nx.read_gml,
+    ".json": read_json_graph,
+}
+
+'''
+Function to read a graph file, with the nodes relabelled to the
+integers from 0 in their sorted order, so that they are the qubits.
+Params:
+    - path: the path of the file.
+Returns:
+    - Graph: the graph.
+'''
+def read_graph(path):
+    extension = os.path.splitext(path)[1].lower()
+    if(extension in READERS):
+        graph = READERS[extension](path)
+    else:
+        graph = nx.read_edgelist(path, nodetype=int)
+    return nx.convert_node_labels_to_integers(graph, ordering="sorted")
+
+'''
+Function to get the graph files of a list of sources: the files inside
+every directory, the paths read from the standard input for '-', and
+the other sources as they are.
+Params:
+    - sources: a list of directories, files or '-'.
+Returns:
+    - list: the paths of the graph files.
+'''
+def get_paths(sources):
+    paths = list()
+    for source in sources:
+        if(source == '-'):
+            paths.extend(line.strip() for line in sys.stdin if line.strip())
+        elif(os.path.isdir(source)):
+            paths.extend(sorted(os.path.join(source, name) for name in os.listdir(source)
+                if os.path.isfile(os.path.join(source, name))))
+        else:
+            paths.append(source)
+    return paths
+
+'''
+Function to get the fingerprint of a graph file, the hash of its
+contents, so that a file that changes is solved again.
+Params:
+    - path: the path of the file.
+Returns:
+    - str: the SHA-1 of the file.
+'''
+def get_file_hash(path):
+    with open(path, 'rb') as graph_file:
+        return hashlib.sha1(graph_file.read()).hexdigest()
+
+'''
+Function that solves a job: it builds the solver of the graph, runs the
+method and gets the best cut from the optimal angles.
+Params:
+    - job: a dict with the path and the hash of the graph file, the
+    method, p, the engine, the backend and the seed.
+Returns:
+    - dict: the job with the angles, the expected cost, the best cut,
+    the evaluations and the seconds spent, or with the error that
+    stopped it.
+'''
+def solve_job(job):
+    record = dict(job)
+    try:
+        np.random.seed(job["seed"])
+        start_time = time.perf_counter()
+        graph = read_graph(job["path"])
+        solver = MaxCutSolver(graph, graph.number_of_nodes(), job["backend"], job["p"], engine=job["engine"])
+        setup_time = time.perf_counter() - start_time
+        result = METHODS[job["method"]](solver)
+        optimize_time = time.perf_counter() - start_time - setup_time
+        gammas, betas = solver.split_parameters(result.x)
+        record.update({
+            "nodes": graph.number_of_nodes(),
+            "edges": graph.number_of_edges(),
+            "gammas": [float(gamma) for gamma in gammas],
+            "betas": [float(beta) for beta in betas],
+            "expectation": float(result.fun),
+            "evaluations": solver.evaluations,
+            "local_search_evaluations": solver.local_search_evaluations,
+            "setup_time": setup_time,
+            "optimize_time": optimize_time,
+        })
+        if(job["engine"] in ('numpy', 'symmetric', 'qiskit')):
+            cut, cost = solver.get_best_cut(result.x)
+            record.update({"best_cut": cut, "best_cut_value": -float(cost)})
+        record["wall_time"] = time.perf_counter() - start_time
+    except Exception as error:
+        record["error"] = repr(error)
+    return record
+
+'''
+Class BatchSolver.
+A queue of jobs kept in a results file of JSON lines. The jobs are
+keyed by the hash of the graph file, the method, p, the engine and
+the backend, and a job is done when the results file holds a record of it without an error.
+'''
+class BatchSolver():
+    '''
+    The constructor of the class.
+    Params:
+        - output: the path of the results file.
+        - methods (optional): the names of the methods of every graph.
+        - p (optional): The p value for the QAOA.
+        - engine (optional): the engine of the solvers.
+        - backend (optional): the backend of the solvers.
+        - seed (optional): the seed of the optimizers.
+        - n_workers (optional): the number of worker processes.
+    '''
+    def __init__(self, output, methods = ("cobyla",), p = 1, engine = 'numpy', backend = 'statevector_simulator',
+        seed = 0, n_workers = None) -> None:
+        self.output = output
+        self.methods = list(methods)
+        self.p = p
+        self.engine = engine
+        self.backend = backend
+        self.seed = seed
+        self.n_workers = n_workers
+
+    '''
+    Method to get the key of a job.
+    Params:
+        - job: the job, or a record of it.
+    Returns:
+        - tuple: the hash of the graph file, the method, p, the engine
+        and the backend.
+    '''
+    def get_key(self, job):
+        return (job["hash"], job["method"], job["p"], job["engine"], job["backend"])
+
+    '''
+    Method to get the keys of the jobs already done. A last line cut by
+    an interruption is ignored, and ended so that the next record
+    starts on its own line.
+    Returns:
+        - set: the keys of the jobs done.
+    '''
+    def get_completed(self):
+        completed = set()
+        if(not os.path.exists(self.output)):
+            return completed
+        with open(self.output) as results:
+            content = results.read()
+        for line in content.splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if("error" not in record):
+                completed.add(self.get_key(record))
+        if(len(content) > 0 and not content.endswith("\n")):
+            with open(self.output, "a") as results:
+                results.write("\n")
+        return completed
+
+    '''
+    Method to get the jobs of the graph files that are not done yet.
+    Params:
+        - paths: the paths of the graph files.
+    Returns:
+        - list: the pending jobs.
+    '''
+    def get_jobs(self, paths):
+        completed = self.get_completed()
+        jobs = list()
+        for path in paths:
+            file_hash = get_file_hash(path)
+            for method in self.methods:
+                job = {"path": path, "hash": file_hash, "method": method, "p": self.p,
+                    "engine": self.engine, "backend": self.backend, "seed": self.seed}
+                if(self.get_key(job) not in completed):
+                    jobs.append(job)
+        return jobs
+
+    '''
+    Method that runs the pending jobs of the graph files on the pool of
+    workers, appending the record of every job as it finishes.
+    Params:
+        - paths: the paths of the graph files.
+        - callback (optional): a function called with every record.
+    Returns:
+        - int: the number of jobs run.
+    '''
+    def run(self, paths, callback = None):
+        jobs = self.get_jobs(paths)
+        if(len(jobs) == 0):
+            return 0
+        with ProcessPoolExecutor(self.n_workers) as executor, open(self.output, "a") as results:
+            futures = [executor.submit(solve_job, job) for job in jobs]
+            for future in as_completed(futures):
+                record = future.result()
+                results.write(json.dumps(record) + "\n")
+                results.flush()
+                if(callback is not None):
+                    callback(record)
+        return len(jobs)
+
+'''
+Function to print the summary of a record.
+Params:
+    - record: the record of a job.
+'''
+def print_record(record):
+    if("error" in record):
+        print("%-40s %-12s failed: %s" % (record["path"], record["method"], record["error"]))
+    else:
+        print("%-40s %-12s %8.3fs %7d evals expectation=%.4f" % (record["path"], record["method"],
+            record["wall_time"], record["evaluations"], record["expectation"]))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="+", help="directories or files of graphs, or - to read their paths from stdin")
+    parser.add_argument("--methods", nargs="+", default=["cobyla"], choices=list(METHODS))
+    parser.add_argument("--p", type=int, default=1)
+    parser.add_argument("--engine", default="numpy")
+    parser.add_argument("--backend", default="statevector_simulator")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default="results.jsonl")
+    args = parser.parse_args()
+    batch = BatchSolver(args.output, args.methods, args.p, args.engine, args.backend, args.seed, args.workers)
+    count = batch.run(get_paths(args.sources), print_record)
+    print("%d jobs run, results in %s" % (count, args.output))
+
+if __name__ == "__main__":
+    main()
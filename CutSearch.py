@@ -0,0 +1,86 @@
+import numpy as np
+'''
+Local search over a batch of cuts, to improve the cuts measured from the
+circuit. Every cut is stored as a row of spins, 1 for the nodes on the
+side 0 and -1 for the nodes on the side 1, together with the local field
+of every node, the sum of the spins of its neighbours. Flipping the node
+v changes the cut by its gain, the spin of v times its field, so the
+gains of every node of every cut are a single array operation.
+'''
+
+'''
+Function to get the spins of a batch of cuts.
+Params:
+    - states: the cuts, with the side of the node i on the bit i.
+    - num_nodes: the number of nodes of the graph.
+Returns:
+    - numpy array: a matrix with the spins of one cut per row.
+'''
+def get_spins(states, num_nodes):
+    return 1 - 2*((np.asarray(states, dtype=np.int64)[:, None] >> np.arange(num_nodes)) & 1)
+
+'''
+Function to get the cuts of a batch of spins.
+Params:
+    - spins: a matrix with the spins of one cut per row.
+Returns:
+    - numpy array: the cuts, with the side of the node i on the bit i.
+'''
+def get_states(spins):
+    return np.sum((spins < 0).astype(np.int64) << np.arange(spins.shape[1]), axis=1)
+
+'''
+Function that flips a node of some cuts and updates their fields.
+Params:
+    - spins: a matrix with the spins of one cut per row.
+    - fields: a matrix with the fields of one cut per row.
+    - adjacency: the adjacency matrix of the graph.
+    - rows: the cuts to change.
+    - nodes: the node to flip of every cut.
+'''
+def flip(spins, fields, adjacency, rows, nodes):
+    fields[rows] -= 2*spins[rows, nodes][:, None]*adjacency[nodes]
+    spins[rows, nodes] = -spins[rows, nodes]
+
+'''
+Function that improves a batch of cuts until no single node, nor pair
+of nodes, can be moved to the other side to cut more edges. On every
+step each cut flips its node of largest gain, and when no cut has a
+node with a positive gain the pairs are tried. Only the pairs of
+neighbours need to be tried: the gain of a pair is the sum of the gains
+of its nodes, minus twice the spin product over the edges between them,
+so the pairs of a cut whose nodes have no positive gain only gain when
+they share an edge.
+Params:
+    - adjacency: the adjacency matrix of the graph.
+    - states: the cuts, with the side of the node i on the bit i.
+    - two_flips (optional): whether to also move pairs of nodes.
+Returns:
+    - numpy array: the improved cuts.
+    - numpy array: the number of edges of every improved cut.
+'''
+def local_search(adjacency, states, two_flips = True):
+    adjacency = np.asarray(adjacency, dtype=float)
+    spins = get_spins(states, len(adjacency)).astype(float)
+    fields = spins @ adjacency
+    first, second = np.nonzero(np.triu(adjacency, 1))
+    edges = adjacency[first, second]
+    rows = np.arange(len(spins))
+    while(True):
+        gains = spins*fields
+        nodes = np.argmax(gains, axis=1)
+        improving = gains[rows, nodes] > 0
+        if(np.any(improving)):
+            flip(spins, fields, adjacency, rows[improving], nodes[improving])
+            continue
+        if(not two_flips or len(edges) == 0):
+            break
+        pair_gains = gains[:, first] + gains[:, second] - 2*edges*spins[:, first]*spins[:, second]
+        pairs = np.argmax(pair_gains, axis=1)
+        improving = pair_gains[rows, pairs] > 0
+        if(not np.any(improving)):
+            break
+        flip(spins, fields, adjacency, rows[improving], first[pairs[improving]])
+        flip(spins, fields, adjacency, rows[improving], second[pairs[improving]])
+    values = (np.sum(adjacency) - np.sum(spins*fields, axis=1))/4
+    return get_states(spins), values
@@ -0,0 +1,244 @@
+import networkx as nx
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+'''
+Exact maximum cuts of graphs, used as the reference optimum of the
+approximation ratios. The cuts are encoded as in the circuit: the bit i
+of a state gives the side of the i-th node of the graph, with the nodes
+sorted when their labels allow it.
+Small graphs are solved by enumerating every cut in Gray code order, so
+that every step flips a single node and updates the cut incrementally,
+and larger sparse graphs by branch and bound.
+'''
+
+'''
+Function to get the nodes of a graph in the order of the bits of the states.
+Params:
+    - graph: the graph.
+Returns:
+    - list: the nodes, sorted when their labels allow it.
+'''
+def get_nodes(graph):
+    try:
+        return sorted(graph.nodes())
+    except TypeError:
+        return list(graph.nodes())
+
+'''
+Function to get the adjacency matrix of a graph, without self loops,
+since they are never cut.
+Params:
+    - graph: the graph.
+Returns:
+    - numpy array: the number of edges between every pair of nodes.
+'''
+def get_adjacency(graph):
+    adjacency = nx.to_numpy_array(graph, nodelist=get_nodes(graph), weight=None)
+    np.fill_diagonal(adjacency, 0)
+    return adjacency
+
+'''
+Function to get the cost of a cut, as the number of edges between its sides.
+Params:
+    - adjacency: the adjacency matrix of the graph.
+    - state: the cut, with the side of the node i on the bit i.
+Returns:
+    - float: the number of cut edges.
+'''
+def get_cut_value(adjacency, state):
+    spins = 1 - 2*((state >> np.arange(len(adjacency))) & 1)
+    return (np.sum(adjacency) - spins @ adjacency @ spins)/4
+
+'''
+Function that enumerates a chunk of the cuts of a graph whose last node
+lies on the side 0. The first low nodes take every assignment at once,
+as a vector with one cut per assignment. The next nodes are split in
+the top prefix_bits ones, fixed by the chunk to prefix, and the other
+ones, that are walked in Gray code order: every step flips one of them
+and adds to the whole vector the change of the cut, the spin of the
+node times its local field.
+Params:
+    - adjacency: the adjacency matrix of the graph.
+    - low: the number of nodes assigned as a vector.
+    - prefix: the assignment of the nodes fixed by the chunk.
+    - prefix_bits: the number of nodes fixed by the chunk.
+Returns:
+    - float: the largest cut of the chunk.
+    - int: the state of the largest cut.
+'''
+def enumerate_chunk(adjacency, low, prefix, prefix_bits):
+    n = len(adjacency)
+    free = n - 1 - low
+    walked = free - prefix_bits
+    states = np.arange(2**low)
+    low_spins = 1 - 2*((states[:, None] >> np.arange(low)) & 1)
+    low_cut = (np.sum(adjacency[:low, :low]) - np.einsum('ki,ij,kj->k', low_spins, adjacency[:low, :low], low_spins))/4
+    low_field = (low_spins @ adjacency[:low, low:]).T
+    high_spins = np.ones(n - low)
+    high_spins[walked:free] = 1 - 2*((prefix >> np.arange(prefix_bits)) & 1)
+    high_adjacency = adjacency[low:, low:]
+    high_field = high_adjacency @ high_spins
+    cut = (low_cut + (np.sum(high_adjacency) - high_spins @ high_field)/4
+        + (np.sum(adjacency[:low, low:]) - high_spins @ low_field)/2)
+    best = np.argmax(cut)
+    best_cut = cut[best]
+    best_state = int(best) | (prefix << (low + walked))
+    gray = 0
+    for step in range(1, 2**walked):
+        node = (step & -step).bit_length() - 1
+        cut += high_spins[node]*(low_field[node] + high_field[node])
+        high_field -= 2*high_spins[node]*high_adjacency[:, node]
+        high_spins[node] = -high_spins[node]
+        gray ^= 1 << node
+        index = np.argmax(cut)
+        if(cut[index] > best_cut):
+            best_cut = cut[index]
+            best_state = int(index) | (gray << low) | (prefix << (low + walked))
+    return float(best_cut), best_state
+
+'''
+Function to get the maximum cut of a graph by enumerating its cuts.
+The last node is kept on the side 0, since flipping every node gives
+the same cut, so only half of the cuts are enumerated. The enumeration
+is split in chunks that fix the side of the last free nodes, which are
+run on a pool of worker processes when an executor or a number of
+workers is given.
+Params:
+    - graph: the graph.
+    - executor (optional): a concurrent.futures executor.
+    - n_workers (optional): the number of worker processes of a new pool.
+    - low (optional): the largest number of nodes assigned as a vector.
+    - prefix_bits (optional): the number of nodes fixed by every chunk,
+    by default enough for four chunks per worker.
+Returns:
+    - float: the number of edges of the maximum cut.
+    - int: the state of the maximum cut.
+'''
+def enumerate_max_cut(graph, executor = None, n_workers = None, low = 16, prefix_bits = None):
+    adjacency = get_adjacency(graph)
+    n = len(adjacency)
+    if(n < 2):
+        return 0.0, 0
+    low = min(low, n - 1)
+    free = n - 1 - low
+    if(prefix_bits is None):
+        workers = 1 if executor is None and n_workers is None else (n_workers or getattr(executor, '_max_workers', 1))
+        prefix_bits = int(np.ceil(np.log2(4*workers))) if workers > 1 else 0
+    prefix_bits = min(prefix_bits, free)
+    prefixes = range(0, 2**prefix_bits)
+    arguments = ([adjacency]*len(prefixes), [low]*len(prefixes), prefixes, [prefix_bits]*len(prefixes))
+    if(executor is None and n_workers is None):
+        chunks = list(map(enumerate_chunk, *arguments))
+    elif(executor is None):
+        with ProcessPoolExecutor(n_workers) as pool:
+            chunks = list(pool.map(enumerate_chunk, *arguments))
+    else:
+        chunks = list(executor.map(enumerate_chunk, *arguments))
+    return max(chunks, key=lambda chunk: chunk[0])
+
+'''
+Function to get a good cut of a graph to bound the branch and bound:
+every node is placed on the side that cuts more edges to the nodes
+already placed, and then single nodes are flipped while they improve
+the cut.
+Params:
+    - adjacency: the adjacency matrix of the graph.
+Returns:
+    - numpy array: the spin of every node, 1 for the side 0 and -1 for the side 1.
+'''
+def get_greedy_spins(adjacency):
+    spins = np.zeros(len(adjacency))
+    for node in range(0, len(adjacency)):
+        spins[node] = -1 if adjacency[node] @ spins > 0 else 1
+    gains = spins*(adjacency @ spins)
+    while(np.max(gains) > 0):
+        node = np.argmax(gains)
+        spins[node] = -spins[node]
+        gains = spins*(adjacency @ spins)
+    return spins
+
+'''
+Function to get the maximum cut of a graph by branch and bound. The
+nodes are placed one at a time, each one the node with the most edges
+to the placed ones, so the edges are decided early. A branch is pruned
+when its cut plus a bound of what is left is not larger than the best
+cut found: every unplaced node cuts at most the larger of its edges to
+each side, and the edges between unplaced nodes are all counted as cut.
+The bound is tight on sparse graphs, where most edges of a node are
+decided when it is placed.
+Params:
+    - graph: the graph.
+Returns:
+    - float: the number of edges of the maximum cut.
+    - int: the state of the maximum cut.
+'''
+def branch_and_bound(graph):
+    adjacency = get_adjacency(graph)
+    n = len(adjacency)
+    if(n < 2):
+        return 0.0, 0
+    spins = get_greedy_spins(adjacency)
+    best = [(np.sum(adjacency) - spins @ adjacency @ spins)/4, spins.copy()]
+    order = [int(np.argmax(np.sum(adjacency, axis=1)))]
+    connections = adjacency[order[0]].copy()
+    connections[order[0]] = -1
+    for _ in range(1, n):
+        node = int(np.argmax(connections + np.sum(adjacency, axis=1)/(n*n + 1)))
+        order.append(node)
+        connections += adjacency[node]
+        connections[order] = -1
+    neighbours = [[(int(other), adjacency[node, other]) for other in np.flatnonzero(adjacency[node])] for node in range(0, n)]
+    sides = np.zeros((n, 2))
+    spins = np.zeros(n)
+
+    '''
+    Function that places the nodes from the k-th one in every way that
+    may improve the best cut.
+    Params:
+        - k: the position in the order of the next node.
+        - cut: the edges cut between the placed nodes.
+        - internal: the edges between the unplaced nodes.
+    '''
+    def place(k, cut, internal):
+        if(k == n):
+            if(cut > best[0]):
+                best[0] = cut
+                best[1] = spins.copy()
+            return
+        unplaced = order[k:]
+        if(cut + internal + np.sum(np.max(sides[unplaced], axis=1)) <= best[0]):
+            return
+        node = order[k]
+        first = 0 if sides[node, 1] >= sides[node, 0] else 1
+        for side in ([0] if k == 0 else [first, 1 - first]):
+            spins[node] = 1 - 2*side
+            unplaced_edges = 0
+            for other, edges in neighbours[node]:
+                if(spins[other] == 0):
+                    sides[other, side] += edges
+                    unplaced_edges += edges
+            place(k + 1, cut + sides[node, 1 - side], internal - unplaced_edges)
+            for other, edges in neighbours[node]:
+                if(spins[other] == 0):
+                    sides[other, side] -= edges
+            spins[node] = 0
+
+    place(0, 0.0, np.sum(adjacency)/2)
+    return float(best[0]), sum(1 << int(node) for node in np.flatnonzero(best[1] < 0))
+
+'''
+Function to get the maximum cut of a graph, by enumeration up to
+max_nodes nodes and by branch and bound beyond.
+Params:
+    - graph: the graph.
+    - executor (optional): a concurrent.futures executor for the enumeration.
+    - n_workers (optional): the number of worker processes of a new pool.
+    - max_nodes (optional): the largest graph solved by enumeration.
+Returns:
+    - float: the number of edges of the maximum cut.
+    - int: the state of the maximum cut.
+'''
+def max_cut(graph, executor = None, n_workers = None, max_nodes = 26):
+    if(graph.number_of_nodes() <= max_nodes):
+        return enumerate_max_cut(graph, executor, n_workers)
+    return branch_and_bound(graph)
@@ -0,0 +1,111 @@
+import networkx as nx
+import numpy as np
+from QAOASimulator import QAOASimulator, get_cost_values
+'''
+Class LightConeQAOA.
+An evaluator of the expectation of the QAOA circuit of a max cut
+instance that never simulates the whole graph. At depth p the term of
+an edge (u, v) only depends on the qubits within distance p of u or v,
+so each term is computed by simulating the subgraph induced by those
+nodes. The edges whose neighbourhoods are isomorphic share the same
+term, so only one neighbourhood of every isomorphism class is simulated
+and its term is weighted by the size of the class.
+'''
+class LightConeQAOA():
+    '''
+    The constructor of the class.
+    Params:
+        - graph: The graph of which we want the max cut.
+        - p: The p value for the QAOA.
+        - max_qubits (optional): The largest neighbourhood that may be
+        simulated.
+    '''
+    def __init__(self, graph, p, max_qubits = 24) -> None:
+        self.p = p
+        classes = dict()
+        for u, v in graph.edges():
+            subgraph = self.get_light_cone(graph, u, v)
+            if(subgraph.number_of_nodes() > max_qubits):
+                raise ValueError("The light cone of the edge " + str((u, v)) + " has " +
+                    str(subgraph.number_of_nodes()) + " qubits, more than " + str(max_qubits))
+            key = nx.weisfeiler_lehman_graph_hash(subgraph, node_attr="root")
+            bucket = classes.setdefault(key, list())
+            for light_cone in bucket:
+                if(nx.is_isomorphic(light_cone[0], subgraph, node_match=lambda a, b: a["root"] == b["root"])):
+                    light_cone[1] += 1
+                    break
+            else:
+                bucket.append([subgraph, 1])
+        self.simulators = list()
+        self.counts = list()
+        for bucket in classes.values():
+            for subgraph, count in bucket:
+                self.simulators.append(self.get_simulator(subgraph))
+                self.counts.append(count)
+        self.numqubits = max([simulator.numqubits for simulator in self.simulators], default=0)
+
+    '''
+    Method that extracts the neighbourhood of an edge, relabelled so
+    that the nodes of the edge are the qubits 0 and 1.
+    Params:
+        - graph: The graph of which we want the max cut.
+        - u, v: The nodes of the edge.
+    Returns:
+        - Graph: the subgraph induced by the nodes within distance p
+        of the edge, with the attribute root set on u and v.
+    '''
+    def get_light_cone(self, graph, u, v):
+        nodes = set(nx.single_source_shortest_path_length(graph, u, cutoff=self.p))
+        nodes |= set(nx.single_source_shortest_path_length(graph, v, cutoff=self.p))
+        order = [u, v] + [node for node in nodes if node != u and node != v]
+        subgraph = nx.relabel_nodes(graph.subgraph(order), {node: i for i, node in enumerate(order)})
+        nx.set_node_attributes(subgraph, {i: str(int(i < 2)) for i in range(len(order))}, "root")
+        return subgraph
+
+    '''
+    Method that builds the simulator of a neighbourhood, whose observable
+    is the cost of the edge between the qubits 0 and 1.
+    Params:
+        - subgraph: the neighbourhood of an edge.
+    Returns:
+        - QAOASimulator: the simulator of the neighbourhood.
+    '''
+    def get_simulator(self, subgraph):
+        num_qubits = subgraph.number_of_nodes()
+        return QAOASimulator(get_cost_values(subgraph.edges(), num_qubits), num_qubits,
+            get_cost_values([(0, 1)], num_qubits))
+
+    '''
+    Method that gets the expected cost of the QAOA state.
+    Params:
+        - gammas: the angles of the cost layers, with shape (p,) or (k, p).
+        - betas: the angles of the mixer layers, with the same shape.
+    Returns:
+        - float: the expected cost, or a numpy array with one expected
+        cost per row of angles.
+    '''
+    def get_expectation(self, gammas, betas):
+        return sum(count * simulator.get_expectation(gammas, betas)
+            for simulator, count in zip(self.simulators, self.counts))
+
+    '''
+    Method that gets the expected cost of the QAOA state together with
+    its exact gradient.
+    Params:
+        - gammas: the angles of the cost layers.
+        - betas: the angles of the mixer layers.
+    Returns:
+        - float: the expected cost.
+        - numpy array: the derivatives with respect to the gammas.
+        - numpy array: the derivatives with respect to the betas.
+    '''
+    def get_expectation_and_gradient(self, gammas, betas):
+        expectation = 0
+        gradient_gammas = np.zeros(len(gammas))
+        gradient_betas = np.zeros(len(betas))
+        for simulator, count in zip(self.simulators, self.counts):
+            value, derivative_gammas, derivative_betas = simulator.get_expectation_and_gradient(gammas, betas)
+            expectation += count * value
+            gradient_gammas += count * derivative_gammas
+            gradient_betas += count * derivative_betas
+        return expectation, gradient_gammas, gradient_betas
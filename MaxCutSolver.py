@@ -1,13 +1,26 @@
-import qiskit.quantum_info as qi
 import numpy as np
-from qiskit import QuantumCircuit, Aer, execute
+import time
+from qiskit import QuantumCircuit, Aer, transpile
 from qiskit.circuit import Parameter
-from scipy.optimize import minimize
 from BA import BA
-from PSO import PSO
-from ACO import ACO
-from ABC import ABC
+from PSO import PSO, SteadyStatePSO
+from ACO import ACO, cobyla_search, gradient_search, pattern_search
+from ABC import ABC, SteadyStateABC
+from Optimizer import optimize_asynchronous, minimize_stopping
+from WarmStart import WarmStartStore, extrapolate, deinterleave, first_guess_linear
 from numpy import pi 
+from Objective import Objective, PoolObjective, CachedObjective, EvaluationCache, shutdown
+from concurrent.futures import ProcessPoolExecutor
+from QAOASimulator import QAOASimulator, SymmetricQAOASimulator, get_cost_values
+from AnalyticQAOA import AnalyticQAOA
+from LightConeQAOA import LightConeQAOA
+from ExactMaxCut import get_adjacency
+from CutSearch import local_search
+
+'''
+The scipy.optimize.minimize methods that make use of the gradient.
+'''
+GRADIENT_METHODS = ('CG', 'BFGS', 'NEWTON-CG', 'L-BFGS-B', 'TNC', 'SLSQP', 'TRUST-CONSTR')
 '''
 Class MaxCutSolver.
 A class that is commited to solve a max cut instance problem.
@@ -21,40 +34,355 @@ class MaxCutSolver():
         - num_qubits: The number of qubits needed.
         - backend: The back for running the experiments.
         - p (optinal): The p value for the QAOA
+        - engine (optional): 'qiskit' to simulate the circuit with qiskit,
+        'numpy' to simulate it with the native QAOASimulator, 'symmetric'
+        to simulate only the 2^(n-1) amplitudes of the states in which the
+        last node is on the side 0 with SymmetricQAOASimulator, 'analytic'
+        to evaluate the p=1 expectation in closed form with AnalyticQAOA
+        or 'lightcone' to sum the terms of the edges simulating only their
+        neighbourhoods with LightConeQAOA. The last two engines do not
+        need the 2^n amplitudes of the circuit.
+        - cache_size (optional): the number of evaluations kept in an
+        evaluation cache shared by every optimizer call of the solver.
+        - warm_start (optional): a WarmStartStore that seeds the optimizers
+        with the angles of similar instances and keeps the angles found.
     '''
-    def __init__(self, graph, num_qubits, backend, p = 1):
+    def __init__(self, graph, num_qubits, backend, p = 1, engine = 'qiskit', cache_size = None, warm_start = None):
         self.graph = graph
+        self.warm_start = warm_start
         self.numqubits = num_qubits
         self.circuit = QuantumCircuit(num_qubits)
         self.backend = backend
-        self.p = p
+        self.p = 0
+        self.engine = engine
+        self.cache = EvaluationCache(cache_size) if cache_size else None
+        self.evaluations = 0
+        self.local_search_evaluations = 0
         for i in range(0,  self.numqubits):
             self.circuit.h(i)
-        gamma = [Parameter("gamma" + str(i)) for i in range(0,p)]
-        beta = [Parameter("beta" + str(i)) for i in range(0,p)]
-        for j in range(0, p):
-            for nodes in list(graph.edges()): 
-                self.circuit.rzz(2 * gamma[j], nodes[0], nodes[1])
-            for i in range(0,  self.numqubits):
-                self.circuit.rx(2 * beta[j], i)
+        for _ in range(0, p):
+            self.append_layer()
+        if (engine == 'analytic'):
+            if (p != 1):
+                raise ValueError("The analytic engine only supports p = 1")
+            self.analytic = AnalyticQAOA(graph)
+            return
+        if (engine == 'lightcone'):
+            self.lightcone = LightConeQAOA(graph, p)
+            return
+        if (engine == 'symmetric'):
+            self.cost_values = get_cost_values(graph.edges(), num_qubits - 1)
+            self.simulator = SymmetricQAOASimulator(self.cost_values, num_qubits)
+            return
+        self.cost_values = self.get_cost_values()
+        self.simulator = QAOASimulator(self.cost_values, num_qubits)
+        if (engine == 'qiskit'):
+            self.qiskit_backend = Aer.get_backend(backend)
+            self.transpiled = self.get_transpiled()
+        elif (engine != 'numpy'):
+            raise ValueError("Unknown engine: " + str(engine))
+
+    '''
+    Method that appends a layer to the circuit, a cost layer with a new
+    angle gamma and a mixer layer with a new angle beta, and updates the
+    positions of the angles in the parameters of the circuit.
+    '''
+    def append_layer(self):
+        gamma = Parameter("gamma" + str(self.p))
+        beta = Parameter("beta" + str(self.p))
+        for nodes in list(self.graph.edges()): 
+            self.circuit.rzz(2 * gamma, nodes[0], nodes[1])
+        for i in range(0,  self.numqubits):
+            self.circuit.rx(2 * beta, i)
+        self.p += 1
+        names = [parameter.name for parameter in self.circuit.parameters]
+        self.gamma_index = [names.index("gamma" + str(i)) for i in range(0,self.p)]
+        self.beta_index = [names.index("beta" + str(i)) for i in range(0,self.p)]
+
+    '''
+    Method that adds a layer to the circuit of the solver, updating the
+    engine that evaluates it, so that the solver of p + 1 reuses the
+    circuit, the cost values and the simulator of the solver of p.
+    '''
+    def add_layer(self):
+        if (self.engine == 'analytic'):
+            raise ValueError("The analytic engine only supports p = 1")
+        self.append_layer()
+        if (self.engine == 'lightcone'):
+            self.lightcone = LightConeQAOA(self.graph, self.p)
+        elif (self.engine == 'qiskit'):
+            self.transpiled = self.get_transpiled()
+
+    '''
+    Method that transpiles the circuit for the qiskit backend, with the
+    measurements of every qubit on the qasm simulator.
+    Returns:
+        - QuantumCircuit: the transpiled circuit.
+    '''
+    def get_transpiled(self):
+        measured = self.circuit.copy()
+        if (self.backend == 'qasm_simulator'):
+            measured.measure_all()
+        return transpile(measured, self.qiskit_backend)
 
     '''
     Method to get the cost of a cut.
     Params: 
-        - bitstring: The cut of the graph.
+        - bitstring: The cut of the graph, in the order of the keys of
+        output_circuit: the side of the node i is the character i from
+        the right, the bit i of the basis state.
     Returns:
         - float: the cost of the cut
     '''
     def get_cost_graph(self, bitstring):
         cost = 0
         for i, j in self.graph.edges():
-            if bitstring[i] != bitstring[j]:
+            if bitstring[-1 - i] != bitstring[-1 - j]:
                 cost -= 1
         return cost
 
+    '''
+    Method to get the cost of every cut of the graph at once.
+    The basis state k encodes the cut in which node i lies on
+    the side given by the bit i of k, the same qubit ordering
+    used by the gates of the circuit. On the symmetric engine
+    self.cost_values only holds the states in which the last node
+    lies on the side 0, since every cut costs the same as the cut
+    with every node on the other side.
+    Returns:
+        - numpy array: an array whose entry k contains the cost
+        of the cut encoded by the basis state k.
+    '''
+    def get_cost_values(self):
+        return get_cost_values(self.graph.edges(), self.numqubits)
+
+    '''
+    Method to split the parameters of the circuit into the angles
+    of the cost layers and the angles of the mixer layers.
+    Params: 
+        - params: a list that contains the parameters
+        for the circuit, in the order of self.circuit.parameters.
+    Returns:
+        - numpy array: the angles gamma of the cost layers.
+        - numpy array: the angles beta of the mixer layers.
+    '''
+    def split_parameters(self, params):
+        params = np.asarray(params, dtype=float)
+        return params[self.gamma_index], params[self.beta_index]
+
+    '''
+    Method to join the angles of the cost layers and of the mixer layers
+    into the parameters of the circuit.
+    Params: 
+        - gammas: the angles gamma of the cost layers.
+        - betas: the angles beta of the mixer layers.
+    Returns:
+        - numpy array: the parameters for the circuit, in the order of
+        self.circuit.parameters.
+    '''
+    def join_parameters(self, gammas, betas):
+        params = np.zeros(2*self.p)
+        params[self.gamma_index] = gammas
+        params[self.beta_index] = betas
+        return params
+
+    '''
+    Method to get the initial point of optimize_classic: the angles of
+    the nearest instance of the warm start store, or otherwise the
+    angles extrapolated layer by layer from the linear ramp of p = 2,
+    or of p = 1 when it is the p of the solver.
+    Returns:
+        - numpy array: the parameters for the circuit.
+    '''
+    def get_initial_point(self):
+        points = self.get_warm_start_points(1)
+        if(len(points) > 0):
+            return points[0]
+        theta = first_guess_linear(min(self.p, 2))
+        for _ in range(2,self.p):
+            theta = extrapolate(theta)
+        return self.join_parameters(*deinterleave(theta))
+
+    '''
+    Method to get the parameters of the nearest instances of the warm
+    start store, extended to the p of the solver.
+    Params: 
+        - k (optional): the number of instances.
+    Returns:
+        - list: the parameters for the circuit of every instance, empty
+        when the solver has no warm start store.
+    '''
+    def get_warm_start_points(self, k = 3):
+        if(self.warm_start is None):
+            return list()
+        return [self.join_parameters(gammas, betas) for gammas, betas in self.warm_start.get_initial_angles(self.graph, self.p, k)]
+
+    '''
+    Method to keep the result of an optimization in the warm start store,
+    if the solver has one.
+    Params: 
+        - result: the OptimizeResult of the optimization.
+    '''
+    def save_warm_start(self, result):
+        if(self.warm_start is not None and result.x is not None):
+            gammas, betas = self.split_parameters(result.x)
+            self.warm_start.save(self.graph, self.p, gammas, betas, result.fun)
+
+    '''
+    Method to draw measurement shots from the probabilities
+    of the basis states.
+    Params: 
+        - probabilities: a numpy array with the probability of
+        every basis state.
+        - shots (optional): the number of shots.
+    Returns:
+        - numpy array: the measured basis states.
+        - numpy array: the number of shots of each measured state.
+    '''
+    def sample_counts(self, probabilities, shots = 1000):
+        counts = np.random.multinomial(shots, probabilities/np.sum(probabilities))
+        states = np.flatnonzero(counts)
+        return states, counts[states]
+
+    '''
+    Method that executes the transpiled circuit once for every
+    parameter vector, submitting only the parameter bindings.
+    Params: 
+        - params_matrix: a matrix that contains one parameter
+        vector per row.
+        - shots (optional): the number of shots of the qasm simulator.
+    Returns:
+        - Result: the qiskit result with one experiment per row.
+    '''
+    def run_circuit(self, params_matrix, shots = 1000):
+        params_matrix = np.atleast_2d(np.asarray(params_matrix, dtype=float))
+        binds = {parameter: list(params_matrix[:, i]) for i, parameter in enumerate(self.circuit.parameters)}
+        return self.qiskit_backend.run(self.transpiled, shots=shots, parameter_binds=[binds]).result()
+
+    '''
+    Method to get the counts of an experiment of a qiskit result as
+    arrays, reading the raw counts of the backend, which are keyed by
+    the measured basis state in hexadecimal, instead of building the
+    dict of bitstrings of get_counts.
+    Params: 
+        - result: the qiskit result.
+        - experiment: the index of the experiment.
+    Returns:
+        - numpy array: the measured basis states, sorted.
+        - numpy array: the number of shots of each measured state.
+    '''
+    def get_result_counts(self, result, experiment):
+        counts = result.data(experiment)["counts"]
+        states = np.fromiter((int(state, 16) for state in counts.keys()), dtype=np.int64, count=len(counts))
+        shots = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+        order = np.argsort(states)
+        return states[order], shots[order]
+
+    '''
+    Method that gets the probability of every basis state of the
+    class circuit, as a dense array indexed by the basis state.
+    On the qasm simulator of the qiskit engine they are the
+    frequencies of the measured states, and on the symmetric engine
+    the probability of every pair of complementary states is split
+    between both.
+    Params: 
+        - params: a list that contains the parameters
+        for the circuit.
+    Returns:
+        - numpy array: the probability of every basis state.
+    '''
+    def get_probabilities(self, params):
+        if (self.engine in ('analytic', 'lightcone')):
+            raise ValueError("The " + self.engine + " engine only evaluates expectations")
+        if (self.engine == 'numpy'):
+            return self.simulator.get_probabilities(*self.split_parameters(params))
+        if (self.engine == 'symmetric'):
+            probabilities = self.simulator.get_probabilities(*self.split_parameters(params))/2
+            return np.concatenate([probabilities, probabilities[::-1]])
+        result = self.run_circuit(params)
+        if (self.backend == 'statevector_simulator'):
+            return np.abs(np.asarray(result.get_statevector(0)))**2
+        states, shots = self.get_result_counts(result, 0)
+        return np.bincount(states, weights=shots, minlength=2**self.numqubits)/np.sum(shots)
+
+    '''
+    Method that measures the class circuit. On the symmetric engine
+    every cut is measured as the state in which the last node lies on
+    the side 0.
+    Params: 
+        - params: a list that contains the parameters
+        for the circuit.
+        - shots (optional): the number of shots.
+    Returns:
+        - numpy array: the measured basis states, sorted.
+        - numpy array: the number of shots of each measured state.
+    '''
+    def get_counts(self, params, shots = 1000):
+        if (self.engine == 'qiskit' and self.backend == 'qasm_simulator'):
+            return self.get_result_counts(self.run_circuit(params, shots), 0)
+        if (self.engine == 'symmetric'):
+            return self.sample_counts(self.simulator.get_probabilities(*self.split_parameters(params)), shots)
+        return self.sample_counts(self.get_probabilities(params), shots)
+
+    '''
+    Method that gets the most probable cuts of the class circuit, the
+    most measured ones on the qasm simulator. A cut and its complement
+    are the same cut, so the probabilities of both states are added and
+    the cut is reported by the state in which the last node lies on the
+    side 0, as on the symmetric engine. Only the k cuts are sorted, after
+    a partial sort of the whole distribution.
+    Params: 
+        - params: a list that contains the parameters
+        for the circuit.
+        - k (optional): the number of cuts.
+    Returns:
+        - numpy array: the basis states of the cuts, from the most probable.
+        - numpy array: the probability, or the number of shots, of each cut.
+    '''
+    def get_top_cuts(self, params, k = 10):
+        if (self.backend == 'qasm_simulator'):
+            states, shots = self.get_counts(params)
+            mask = 2**self.numqubits - 1
+            states, inverse = np.unique(np.minimum(states, states ^ mask), return_inverse=True)
+            values = np.bincount(inverse, weights=shots).astype(np.int64)
+        elif (self.engine == 'symmetric'):
+            values = self.simulator.get_probabilities(*self.split_parameters(params))
+            states = np.arange(len(values))
+        else:
+            probabilities = self.get_probabilities(params)
+            half = len(probabilities) // 2
+            values = probabilities[:half] + probabilities[::-1][:half]
+            states = np.arange(half)
+        k = min(k, len(values))
+        top = np.argpartition(values, len(values) - k)[len(values) - k:]
+        top = top[np.argsort(values[top], kind='stable')[::-1]]
+        return states[top], values[top]
+
+    '''
+    Method that gets the best cut of the class circuit, improving its
+    k most probable cuts with a local search that moves single nodes,
+    and pairs of nodes, to the other side while they cut more edges.
+    Params: 
+        - params: a list that contains the parameters
+        for the circuit.
+        - k (optional): the number of cuts.
+        - two_flips (optional): whether to also move pairs of nodes.
+    Returns:
+        - int: the basis state of the best cut.
+        - float: the cost of the best cut.
+    '''
+    def get_best_cut(self, params, k = 10, two_flips = True):
+        states, _ = self.get_top_cuts(params, k)
+        states, values = local_search(get_adjacency(self.graph), states, two_flips)
+        best = np.argmax(values)
+        return int(states[best]), -values[best]
+
     '''
     Method that applies a measurement and executes the class circuit 
     using the parameters passed as a parameter.
+    The results are built from get_probabilities or get_counts, which
+    should be preferred on large circuits, since this dict holds a
+    bitstring for every state with a nonzero probability.
     Params: 
         - params: a list that contains the parameters
         for the circuit.
@@ -63,17 +391,13 @@ class MaxCutSolver():
         the execution.
     '''
     def output_circuit(self, params):
-        backend = Aer.get_backend(self.backend)
-        backend.shots = 1000
-        qc_res = self.circuit.copy()
-        qc_res = qc_res.bind_parameters(params)
         if (self.backend == 'statevector_simulator'):
-            result = qi.Statevector.from_instruction(qc_res).probabilities_dict()
-            return result
+            probabilities = self.get_probabilities(params)
+            states = np.flatnonzero(probabilities)
+            values = probabilities[states]
         else:
-            qc_res.measure_all()
-            counts = backend.run(qc_res).result().get_counts()
-            return counts
+            states, values = self.get_counts(params)
+        return {format(state, '0' + str(self.numqubits) + 'b'): value.item() for state, value in zip(states, values)}
 
     '''
     Method that gets the average value of the execution
@@ -85,82 +409,195 @@ class MaxCutSolver():
         - float: the average value of the excution.
     '''
     def get_expectation(self, params):
-        backend = Aer.get_backend(self.backend)
-        qc = self.circuit.copy()
-        qc = qc.bind_parameters(params)
+        if (self.engine == 'analytic'):
+            gammas, betas = self.split_parameters(params)
+            return self.analytic.get_expectation(gammas[0], betas[0])
+        if (self.engine == 'lightcone'):
+            return self.lightcone.get_expectation(*self.split_parameters(params))
+        if (self.engine in ('numpy', 'symmetric')):
+            gammas, betas = self.split_parameters(params)
+            if (self.backend == 'qasm_simulator'):
+                return self.get_states_expectation(*self.sample_counts(self.simulator.get_probabilities(gammas, betas)))
+            return self.simulator.get_expectation(gammas, betas)
+        return self.get_expectation_batch(params)[0]
+
+    '''
+    Method that gets the average cost of a dict of counts.
+    Params: 
+        - counts: a python dict that contains the counts of
+        an execution.
+    Returns:
+        - float: the average cost of the counts.
+    '''
+    def get_counts_expectation(self, counts):
+        states = np.array([int(bitstring, 2) for bitstring in counts.keys()])
+        shots = np.array(list(counts.values()))
+        return self.get_states_expectation(states, shots)
+
+    '''
+    Method that gets the average cost of measured basis states.
+    Params: 
+        - states: a numpy array with the measured basis states.
+        - shots: a numpy array with the number of shots of each state.
+    Returns:
+        - float: the average cost of the shots.
+    '''
+    def get_states_expectation(self, states, shots):
+        return np.dot(self.cost_values[states], shots)/np.sum(shots)
 
+    '''
+    Method that gets the average value of the execution of the
+    class circuit for a whole population of parameters at once.
+    The native engine simulates the population as a batch of states
+    and the qiskit engine submits the bindings of every parameter
+    vector in a single execution of the transpiled circuit.
+    Params: 
+        - params_matrix: a matrix with shape (k, 2p) that contains
+        one parameter vector per row.
+    Returns:
+        - numpy array: the average value of each parameter vector.
+    '''
+    def get_expectation_batch(self, params_matrix):
+        params_matrix = np.atleast_2d(np.asarray(params_matrix, dtype=float))
+        if (self.engine == 'analytic'):
+            return self.analytic.get_expectation(params_matrix[:, self.gamma_index[0]], params_matrix[:, self.beta_index[0]])
+        if (self.engine in ('numpy', 'symmetric', 'lightcone')):
+            if (self.engine != 'lightcone' and self.backend == 'qasm_simulator'):
+                return np.array([self.get_expectation(params) for params in params_matrix])
+            simulator = self.lightcone if self.engine == 'lightcone' else self.simulator
+            gammas = params_matrix[:, self.gamma_index]
+            betas = params_matrix[:, self.beta_index]
+            chunk = max(1, 2**22 // 2**simulator.numqubits)
+            return np.concatenate([simulator.get_expectation(gammas[i:i + chunk], betas[i:i + chunk])
+                for i in range(0, len(params_matrix), chunk)])
+        result = self.run_circuit(params_matrix)
         if (self.backend == 'qasm_simulator'):
-            qc.measure_all()
-            counts = execute(qc, nshots=1000, backend=backend).result().get_counts()
+            return np.array([self.get_states_expectation(*self.get_result_counts(result, i)) for i in range(0, len(params_matrix))])
+        return np.array([np.dot(np.abs(np.asarray(result.get_statevector(i)))**2, self.cost_values)
+            for i in range(0, len(params_matrix))])
+
+    '''
+    Method that gets the exact average value of the class circuit
+    together with its gradient, computed by adjoint differentiation
+    on the statevector of the native QAOASimulator. The value is exact
+    for every backend, since the gradient of a sampled average would
+    only be noise.
+    Params: 
+        - params: a list that contains the parameters
+        for the circuit.
+    Returns:
+        - float: the average value of the execution.
+        - numpy array: the gradient with respect to the parameters,
+        in the same order as the parameters.
+    '''
+    def get_expectation_and_gradient(self, params):
+        gammas, betas = self.split_parameters(params)
+        simulator = self.lightcone if self.engine == 'lightcone' else self.simulator
+        expectation, gradient_gammas, gradient_betas = simulator.get_expectation_and_gradient(gammas, betas)
+        gradient = np.zeros(2*self.p)
+        gradient[self.gamma_index] = gradient_gammas
+        gradient[self.beta_index] = gradient_betas
+        return expectation, gradient
+
+    '''
+    Method that creates a pool of worker processes in which every
+    worker builds its own copy of this solver once, so that the
+    evaluations only send parameter vectors to the workers.
+    Params: 
+        - n_workers (optional): the number of worker processes.
+    Returns:
+        - ProcessPoolExecutor: the pool of workers.
+    '''
+    def get_executor(self, n_workers = None):
+        return ProcessPoolExecutor(max_workers=n_workers, initializer=init_worker,
+            initargs=(self.graph, self.numqubits, self.backend, self.p, self.engine))
+
+    '''
+    Method that gets the objective function handed to the optimizers.
+    When the solver has an evaluation cache, the objective looks up
+    the parameter vectors in it before evaluating them.
+    Params: 
+        - executor (optional): a pool created with get_executor, to
+        evaluate the populations in parallel.
+        - n_workers (optional): the number of worker processes of a new
+        pool, when no executor is given.
+    Returns:
+        - Objective: the expectation of the circuit.
+    '''
+    def get_objective(self, executor = None, n_workers = None):
+        if(executor is None and n_workers is None):
+            objective = Objective(self.get_expectation, self.get_expectation_batch)
         else:
-            counts = qi.Statevector.from_instruction(qc).probabilities_dict()
-        avg = 0
-        sum_count = 0
-        for bitstring, count in counts.items():
-            obj = self.get_cost_graph(bitstring)
-            avg += obj * count
-            sum_count += count
-        return avg/sum_count
-        
+            pool = executor if executor else self.get_executor(n_workers)
+            objective = PoolObjective(self.get_expectation, pool, n_workers, worker_expectation_batch)
+            objective.owns_executor = executor is None
+        if(self.cache is not None):
+            return CachedObjective(objective, self.cache)
+        return objective
+
+    '''
+    Method that releases an objective at the end of an optimization,
+    adding its evaluations to the count of the solver and shutting
+    down its pool, if it has one.
+    Params: 
+        - objective: the objective created by get_objective.
+    '''
+    def release_objective(self, objective):
+        self.evaluations += objective.evaluations
+        shutdown(objective)
+
+    '''
+    Method that runs an optimizer that follows the ask and tell interface
+    of Optimizer over the expectation of the circuit. Every population
+    that the optimizer asks for is evaluated at once by the objective of
+    get_objective.
+    Params: 
+        - optimizer: the Optimizer.
+        - executor (optional): a pool created with get_executor, to
+        evaluate the populations in parallel.
+        - n_workers (optional): the number of worker processes of a new
+        pool, when no executor is given.
+        - stopping (optional): a StoppingCriteria to stop before the
+        optimizer uses all its iterations.
+    Returns:
+        - OptimizeResult: the result of the optimizer, with the optimal
+        values in x and the reason why it stopped in stop_reason.
+    '''
+    def run_optimizer(self, optimizer, executor = None, n_workers = None, stopping = None):
+        optimizer.seed(self.get_warm_start_points())
+        expectation = self.get_objective(executor, n_workers)
+        result = optimizer.optimize(expectation, stopping=stopping)
+        self.release_objective(expectation)
+        self.save_warm_start(result)
+        return result
+
     '''
     Method that gets the optimal values for the parameters
     of the class circuit using the COBYLA optimizer.
+    The methods that use a gradient receive the exact one from
+    get_expectation_and_gradient instead of finite differences, except
+    on the analytic engine, where finite differences are already cheap.
     Params: 
+        - method: the scipy.optimize.minimize method.
         - init_point: the initial point for the cobyla
         optimizer.
+        - stopping (optional): a StoppingCriteria to stop before the
+        method converges.
     Returns:
-        - list: a python list that contains the optimal values.
-    '''
-    def optimize_classic(self, method, init_point = None):
-        #def first_guess_linear(n):
-        #    theta = [random.uniform(0, pi) for _ in range(0,n)] + [random.uniform(0, 2*pi) for _ in range(0,n)]
-        #    return (theta)
-        def first_guess_linear(p,m1=0.5,m2=0.5):
-            theta=np.zeros([2*p])
-            for i in range(2*p):
-                if i % 2 ==0:
-                    theta[i]=m1*(i+1)/(2*p)
-                else:
-                    theta[i]=m2*(2*p-i)/(2*p)
-            return(theta)
-        def x_ungerade(i,p):# for odd angles (gamma's)
-            return (i+0.5)/p
-            #return (i+0.25)/(p-0.75)   # unclear what is the best choice for x_i
-        def x_gerade(i,p): # for even angles (beta's)
-            return (i+0.5)/p
-            #return i/p  # unclear what is the best choice for x_i
-        def extrapolate(theta):
-            p=len(theta)//2+1
-            if p<=2: # Extrapolation only makes sense for p>2. Otherwise, take linear guess
-                return(first_guess_linear(p))
-            else:
-                theta2=np.zeros([2*p])
-                for i in range(2*p):
-                    if i % 2 == 0:
-                        x_func = x_ungerade
-                        j=0
-                    else:
-                        x_func = x_gerade
-                        j=1
-                    x=x_func(i//2,p)
-                    while x_func(j//2 +1,p-1)<x:
-                        j+=2
-                    while j//2>p-3:
-                        j-=2
-                    x1=x_func(j//2,p-1)
-                    x2=x_func(j//2+1,p-1)
-                    y1=theta[j]
-                    y2=theta[j+2]
-                    theta2[i]=((y1-y2)*x+x1*y2-y1*x2)/(x1-x2)
-                    i+=1
-            return(theta2)
-        expectation = self.get_expectation
-        if(not init_point):
-            theta=[]
-            for _ in range(1,self.p+1):
-                theta = extrapolate(theta)
-            init_point = theta
-        res = minimize(expectation, init_point, method=method)
+        - OptimizeResult: the result of the method, with the optimal
+        values in x and the reason why it stopped in stop_reason.
+    '''
+    def optimize_classic(self, method, init_point = None, stopping = None):
+        expectation = self.get_objective()
+        if(init_point is None or len(init_point) == 0):
+            init_point = self.get_initial_point()
+        if (method.upper() in GRADIENT_METHODS and self.engine != 'analytic'):
+            expectation = Objective(self.get_expectation_and_gradient)
+            res = minimize_stopping(expectation, init_point, stopping, method=method, jac=True)
+        else:
+            res = minimize_stopping(expectation, init_point, stopping, method=method)
+        self.release_objective(expectation)
+        self.save_warm_start(res)
         return res
 
     '''
@@ -170,13 +607,22 @@ class MaxCutSolver():
         - interval: the interval to initialize each coordinate of the initial point
         of the particles.
         - dimentions: the number of parameters for the optimizer to optimize.
+        - executor (optional): a pool created with get_executor, to
+        evaluate the populations in parallel.
+        - n_workers (optional): the number of worker processes of a new
+        pool, when no executor is given.
+        - num_particles (optional): the number of particles in the swarm.
+        - num_iterations (optional): the number of iterations of the swarm.
+        - stopping (optional): a StoppingCriteria to stop before the
+        optimizer uses all its iterations.
     Returns:
-        - list: a python list that contains the optimal values.
+        - OptimizeResult: the result of the optimizer, with the optimal
+        values in x.
     '''
-    def optimize_swarm(self, interval):
-        expectation = self.get_expectation
-        pso =  PSO(num_particles=20, num_params=self.p*2, interval=interval, function=expectation)
-        return pso.run(w=0.4,c1=0.1,c2=0.1, num_iterations=50)
+    def optimize_swarm(self, interval, executor = None, n_workers = None, num_particles = 20, num_iterations = 50, stopping = None):
+        pso =  PSO(num_particles=num_particles, num_params=self.p*2, interval=interval,
+            w=0.4, c1=0.1, c2=0.1, num_iterations=num_iterations)
+        return self.run_optimizer(pso, executor, n_workers, stopping)
 
 
     '''
@@ -186,13 +632,20 @@ class MaxCutSolver():
         - interval: the interval to initialize each coordinate of the initial point
         of the particles.
         - dimentions: the number of parameters for the optimizer to optimize.
+        - executor (optional): a pool created with get_executor, to
+        evaluate the populations in parallel.
+        - n_workers (optional): the number of worker processes of a new
+        pool, when no executor is given.
+        - stopping (optional): a StoppingCriteria to stop before the
+        optimizer uses all its iterations.
     Returns:
-        - list: a python list that contains the optimal values.
+        - OptimizeResult: the result of the optimizer, with the optimal
+        values in x.
     '''
-    def optimize_bees(self, interval):
-        expectation = self.get_expectation
-        abc =  ABC(dimention=self.p*2, num_points=30, bonds=interval, numlookers=15, fx=expectation)
-        return abc.run(num_iterations=50, limit=15, a=pi)
+    def optimize_bees(self, interval, executor = None, n_workers = None, stopping = None):
+        abc =  ABC(dimention=self.p*2, num_points=30, bonds=interval, numlookers=15,
+            num_iterations=50, limit=15, a=pi)
+        return self.run_optimizer(abc, executor, n_workers, stopping)
 
 
     '''
@@ -202,13 +655,19 @@ class MaxCutSolver():
         - interval: the interval to initialize each coordinate of the initial point
         of the bats.
         - dimentions: the number of parameters for the optimizer to optimize.
+        - executor (optional): a pool created with get_executor, to
+        evaluate the populations in parallel.
+        - n_workers (optional): the number of worker processes of a new
+        pool, when no executor is given.
+        - stopping (optional): a StoppingCriteria to stop before the
+        optimizer uses all its iterations.
     Returns:
-        - list: a python list that contains the optimal values.
+        - OptimizeResult: the result of the optimizer, with the optimal
+        values in x.
     '''
-    def optimize_bats(self, interval):
-        expectation = self.get_expectation
+    def optimize_bats(self, interval, executor = None, n_workers = None, stopping = None):
         ba = BA(number_of_bats=20, num_dimentions=self.p*2, interval=interval, number_of_iterations=50, alfa= 0.9, gamma=0.9)
-        return ba.run(expectation)
+        return self.run_optimizer(ba, executor, n_workers, stopping)
 
     '''
     Method that gets the optimal values for the parameters
@@ -217,12 +676,168 @@ class MaxCutSolver():
         - interval: the interval to initialize each coordinate of the initial point
         of the ants.
         - dimentions: the number of parameters for the optimizer to optimize.
+        - executor (optional): a pool created with get_executor, to
+        evaluate the populations in parallel.
+        - n_workers (optional): the number of worker processes of a new
+        pool, when no executor is given.
+        - local_search (optional): the local search that refines the best
+        ants: 'cobyla', 'pattern', that evaluates its steps in batches,
+        'gradient', that uses the exact gradient, or None.
+        - top_k (optional): the number of ants refined on every iteration.
+        - local_budget (optional): the evaluations that the local search
+        may spend during the whole run.
+        - stopping (optional): a StoppingCriteria to stop before the
+        optimizer uses all its iterations.
     Returns:
-        - list: a python list that contains the optimal values.
+        - OptimizeResult: the result of the optimizer, with the optimal
+        values in x and the evaluations of the local search in
+        local_search_evaluations.
     '''
-    def optimize_ants(self, interval):
-        expectation = self.get_expectation
+    def optimize_ants(self, interval, executor = None, n_workers = None, local_search = 'cobyla', top_k = 5, local_budget = None, stopping = None):
+        refiners = {'cobyla': cobyla_search, 'pattern': pattern_search, 'gradient': gradient_search, None: None}
+        if(local_search not in refiners):
+            raise ValueError("Unknown local search: " + str(local_search))
+        if(local_search == 'gradient' and self.engine == 'analytic'):
+            raise ValueError("The analytic engine has no gradient")
+        local_expectation = Objective(self.get_expectation_and_gradient) if local_search == 'gradient' else None
         aco = ACO(num_params=self.p*2,discrete_points=200,interval=interval,
-        number_ants=20,q=0.5, evaporation_rate=0.9, num_iterations = 10)
-        return aco.run(expectation)
-        
\ No newline at end of file
+        number_ants=20,q=0.5, evaporation_rate=0.9, num_iterations = 10,
+        local_search=refiners[local_search], top_k=top_k, local_budget=local_budget, local_fx=local_expectation)
+        result = self.run_optimizer(aco, executor, n_workers, stopping)
+        if(local_expectation is not None):
+            self.release_objective(local_expectation)
+        self.local_search_evaluations += aco.local_search_evaluations
+        return result
+
+    '''
+    Method that optimizes the circuit for every p from the current one to
+    p_max, adding one layer at a time. Every p after the first starts from
+    the optimal angles of the previous one, extended with extrapolate
+    through the warm start store of the solver, or a temporary one when
+    the solver has none. The solver is left with p = p_max.
+    Params: 
+        - p_max: the last p of the sweep.
+        - method (optional): a scipy.optimize.minimize method for
+        optimize_classic, or 'swarm', 'bats', 'bees' or 'ants'.
+        - interval (optional): the interval of the metaheuristics.
+        - **options: the other arguments of the optimize method.
+    Returns:
+        - list: a dict per p with the optimal values x, their expected
+        cost fun, the evaluations nfev and the seconds spent.
+    '''
+    def sweep_p(self, p_max, method = 'COBYLA', interval = [0, pi], **options):
+        previous_store = self.warm_start
+        if(self.warm_start is None):
+            self.warm_start = WarmStartStore()
+        sweep = list()
+        try:
+            while(True):
+                start_time = time.perf_counter()
+                if(method in ('swarm', 'bats', 'bees', 'ants')):
+                    result = getattr(self, 'optimize_' + method)(interval, **options)
+                else:
+                    result = self.optimize_classic(method, **options)
+                sweep.append({"p": self.p, "x": np.array(result.x), "fun": result.fun, "nfev": result.nfev,
+                    "time": time.perf_counter() - start_time})
+                if(self.p >= p_max):
+                    break
+                self.add_layer()
+        finally:
+            self.warm_start = previous_store
+        return sweep
+
+    '''
+    Method that gets the optimal values for the parameters of the class
+    circuit with a steady-state optimizer, that keeps a fixed number of
+    evaluations in flight on a pool of workers and moves as soon as any
+    of them finishes, instead of waiting for whole populations.
+    Params: 
+        - method: the optimizer, 'swarm' or 'bees'.
+        - interval: the interval to initialize each coordinate of the
+        initial points.
+        - executor (optional): a pool created with get_executor.
+        - n_workers (optional): the number of worker processes of a new
+        pool, when no executor is given.
+        - in_flight (optional): the number of evaluations in flight. It
+        is the number of workers when it is not given.
+        - max_evaluations (optional): the number of evaluations.
+        - stopping (optional): a StoppingCriteria to stop before the
+        optimizer uses all its evaluations. Its window counts evaluations.
+    Returns:
+        - OptimizeResult: the result of the optimizer, with the optimal
+        values in x.
+    '''
+    def optimize_steady_state(self, method, interval, executor = None, n_workers = None, in_flight = None, max_evaluations = 1000, stopping = None):
+        if(method == 'swarm'):
+            optimizer = SteadyStatePSO(num_particles=20, num_params=self.p*2, interval=interval, max_evaluations=max_evaluations)
+        elif(method == 'bees'):
+            optimizer = SteadyStateABC(dimention=self.p*2, num_points=30, bonds=interval, limit=15, a=pi, max_evaluations=max_evaluations)
+        else:
+            raise ValueError("Unknown steady-state method: " + str(method))
+        optimizer.seed(self.get_warm_start_points())
+        pool = executor if executor else self.get_executor(n_workers)
+        try:
+            result = optimize_asynchronous(optimizer, worker_expectation, pool, n_workers, in_flight, stopping)
+        finally:
+            if(executor is None):
+                pool.shutdown()
+        self.evaluations += result.nfev
+        self.save_warm_start(result)
+        return result
+
+'''
+Function that builds the solver of a worker process of the pool
+created by MaxCutSolver.get_executor.
+Params: 
+    - graph: The graph of which we want the max cut.
+    - num_qubits: The number of qubits needed.
+    - backend: The back for running the experiments.
+    - p: The p value for the QAOA
+    - engine: The engine that simulates the circuit.
+'''
+def init_worker(graph, num_qubits, backend, p, engine):
+    global worker_solver, worker_args
+    worker_args = (graph, num_qubits, backend, engine)
+    worker_solver = MaxCutSolver(graph, num_qubits, backend, p, engine)
+
+'''
+Function to get the solver of a worker process for the p of the
+parameters it receives, since the pool may outlive the p of the solver
+that created it, as in MaxCutSolver.sweep_p. The solver grows with
+add_layer, and it is built again for a smaller p.
+Params: 
+    - num_params: the number of parameters of the circuit.
+Returns:
+    - MaxCutSolver: the solver of the worker.
+'''
+def get_worker_solver(num_params):
+    global worker_solver
+    p = num_params // 2
+    if(worker_solver.p > p):
+        graph, num_qubits, backend, engine = worker_args
+        worker_solver = MaxCutSolver(graph, num_qubits, backend, p, engine)
+    while(worker_solver.p < p):
+        worker_solver.add_layer()
+    return worker_solver
+
+'''
+Function that evaluates a chunk of parameter vectors on the solver
+of a worker process.
+Params: 
+    - params_matrix: a matrix that contains one parameter vector per row.
+Returns:
+    - numpy array: the average value of each parameter vector.
+'''
+def worker_expectation_batch(params_matrix):
+    return get_worker_solver(np.shape(params_matrix)[-1]).get_expectation_batch(params_matrix)
+
+'''
+Function that evaluates a single parameter vector on the solver of a
+worker process.
+Params: 
+    - params: the parameters of the circuit.
+Returns:
+    - float: the average value of the parameters.
+'''
+def worker_expectation(params):
+    return get_worker_solver(len(params)).get_expectation(params)
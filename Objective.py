@@ -0,0 +1,283 @@
+import numpy as np
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+'''
+Class Objective.
+An objective function that, besides evaluating a single point, is
+capable of evaluating a whole population of points with one call.
+The objective counts the points that it evaluates.
+'''
+class Objective():
+    '''
+    The constructor of the class.
+    Params:
+        - function: the objective function.
+        - batch_function (optional): a function that receives a matrix
+        with one point per row and returns the cost of every point.
+    '''
+    def __init__(self, function, batch_function = None) -> None:
+        self.function = function
+        self.batch_function = batch_function
+        self.evaluations = 0
+
+    '''
+    Method to evaluate a single point.
+    Params:
+        - position: the coordinates of the point.
+    Returns:
+        - float: the cost of the point.
+    '''
+    def __call__(self, position):
+        self.evaluations += 1
+        return self.function(position)
+
+    '''
+    Method to evaluate a population of points.
+    Params:
+        - positions: a list or matrix with one point per row.
+    Returns:
+        - numpy array: the cost of every point.
+    '''
+    def evaluate(self, positions):
+        self.evaluations += len(positions)
+        if(self.batch_function is None):
+            return np.array([self.function(position) for position in positions])
+        return np.asarray(self.batch_function(np.asarray(positions, dtype=float)))
+
+    '''
+    Method to release the resources held by the objective.
+    '''
+    def shutdown(self):
+        pass
+
+'''
+Class PoolObjective.
+An objective function that evaluates the points of a population in
+parallel on a pool of worker processes.
+'''
+class PoolObjective(Objective):
+    '''
+    The constructor of the class.
+    Params:
+        - function: the objective function. It must be picklable.
+        - executor (optional): a concurrent.futures executor to run the
+        evaluations. When it is not given, a process pool is created and
+        it is shut down by the shutdown method.
+        - n_workers (optional): the number of worker processes. By default
+        it is the number of workers of the executor, or of processors.
+        - batch_function (optional): a picklable function that evaluates a
+        matrix of points on a worker. When it is given, the population is
+        split in one chunk per worker instead of sending point by point.
+    '''
+    def __init__(self, function, executor = None, n_workers = None, batch_function = None) -> None:
+        super().__init__(function, batch_function)
+        if(not n_workers and executor is not None):
+            n_workers = getattr(executor, '_max_workers', None)
+        self.n_workers = n_workers if n_workers else os.cpu_count()
+        self.owns_executor = executor is None
+        self.executor = executor if executor else ProcessPoolExecutor(max_workers=self.n_workers)
+
+    '''
+    Method to evaluate a population of points on the pool.
+    Params:
+        - positions: a list or matrix with one point per row.
+    Returns:
+        - numpy array: the cost of every point.
+    '''
+    def evaluate(self, positions):
+        self.evaluations += len(positions)
+        if(self.batch_function is None):
+            chunksize = max(1, len(positions) // self.n_workers)
+            return np.array(list(self.executor.map(self.function, positions, chunksize=chunksize)))
+        chunks = np.array_split(np.asarray(positions, dtype=float), min(self.n_workers, len(positions)))
+        return np.concatenate(list(self.executor.map(self.batch_function, chunks)))
+
+    '''
+    Method to release the pool, if it was created by the objective.
+    '''
+    def shutdown(self):
+        if(self.owns_executor):
+            self.executor.shutdown()
+
+'''
+Class EvaluationCache.
+A bounded cache of evaluated points that forgets the least recently
+used point when it is full. The points are quantized to a resolution,
+so the points that are closer than the resolution share an entry.
+'''
+class EvaluationCache():
+    '''
+    The constructor of the class.
+    Params:
+        - max_size (optional): the maximum number of cached points.
+        - resolution (optional): the resolution used to quantize the points.
+    '''
+    def __init__(self, max_size = 4096, resolution = 1e-10) -> None:
+        self.values = OrderedDict()
+        self.max_size = max_size
+        self.resolution = resolution
+        self.hits = 0
+        self.misses = 0
+
+    '''
+    Method to get the key of a point.
+    Params:
+        - position: the coordinates of the point.
+    Returns:
+        - bytes: the quantized coordinates of the point. They are kept as
+        floats, since the coordinates over the resolution may not fit in
+        an integer, and -0.0 is turned into 0.0 so that both share a key.
+    '''
+    def get_key(self, position):
+        return (np.round(np.asarray(position, dtype=float)/self.resolution) + 0.0).tobytes()
+
+    '''
+    Method to look up the cost of a point.
+    Params:
+        - key: the key of the point.
+    Returns:
+        - float: the cost of the point, or None if it is not cached.
+    '''
+    def get(self, key):
+        if(key in self.values):
+            self.values.move_to_end(key)
+            self.hits += 1
+            return self.values[key]
+        self.misses += 1
+        return None
+
+    '''
+    Method to store the cost of a point.
+    Params:
+        - key: the key of the point.
+        - value: the cost of the point.
+    '''
+    def put(self, key, value):
+        self.values[key] = value
+        self.values.move_to_end(key)
+        if(len(self.values) > self.max_size):
+            self.values.popitem(last=False)
+
+    '''
+    Method to forget every cached point and reset the counters.
+    '''
+    def clear(self):
+        self.values.clear()
+        self.hits = 0
+        self.misses = 0
+
+    '''
+    Method to get the number of cached points.
+    Returns:
+        - int: the number of cached points.
+    '''
+    def __len__(self):
+        return len(self.values)
+
+'''
+Class CachedObjective.
+An objective function that looks up every point in an evaluation cache
+before evaluating it, and only evaluates the points that are missing.
+Only the evaluations of missing points are counted.
+'''
+class CachedObjective(Objective):
+    '''
+    The constructor of the class.
+    Params:
+        - function: the objective function.
+        - cache: the EvaluationCache, which may be shared between objectives.
+    '''
+    def __init__(self, function, cache) -> None:
+        super().__init__(function)
+        self.cache = cache
+
+    '''
+    Method to evaluate a single point.
+    Params:
+        - position: the coordinates of the point.
+    Returns:
+        - float: the cost of the point.
+    '''
+    def __call__(self, position):
+        key = self.cache.get_key(position)
+        value = self.cache.get(key)
+        if(value is None):
+            self.evaluations += 1
+            value = self.function(position)
+            self.cache.put(key, value)
+        return value
+
+    '''
+    Method to evaluate a population of points. The points that are not
+    cached are evaluated together as one population.
+    Params:
+        - positions: a list or matrix with one point per row.
+    Returns:
+        - numpy array: the cost of every point.
+    '''
+    def evaluate(self, positions):
+        values = np.empty(len(positions))
+        missing = OrderedDict()
+        for i, position in enumerate(positions):
+            key = self.cache.get_key(position)
+            if(key in missing):
+                self.cache.hits += 1
+                missing[key].append(i)
+                continue
+            value = self.cache.get(key)
+            if(value is None):
+                missing[key] = [i]
+            else:
+                values[i] = value
+        if(missing):
+            self.evaluations += len(missing)
+            costs = evaluate_population(self.function, [positions[indices[0]] for indices in missing.values()])
+            for (key, indices), cost in zip(missing.items(), costs):
+                self.cache.put(key, cost)
+                values[indices] = cost
+        return values
+
+    '''
+    Method to release the resources held by the wrapped objective.
+    '''
+    def shutdown(self):
+        shutdown(self.function)
+
+'''
+Function to make an objective function evaluate its populations in parallel.
+Params:
+    - function: the objective function.
+    - executor (optional): a concurrent.futures executor.
+    - n_workers (optional): the number of worker processes of a new pool.
+Returns:
+    - the objective function, wrapped in a PoolObjective when an executor
+    or a number of workers is given.
+'''
+def parallelize(function, executor = None, n_workers = None):
+    if(executor is None and n_workers is None):
+        return function
+    return PoolObjective(function, executor, n_workers)
+
+'''
+Function to release the pool of an objective function, if it has one.
+Params:
+    - function: the objective function.
+'''
+def shutdown(function):
+    if(isinstance(function, Objective)):
+        function.shutdown()
+
+'''
+Function to evaluate a population of points with the objective function.
+The whole population is passed at once to the objectives that support it.
+Params:
+    - function: the objective function.
+    - positions: a list or matrix with one point per row.
+Returns:
+    - numpy array: the cost of every point.
+'''
+def evaluate_population(function, positions):
+    if(isinstance(function, Objective)):
+        return function.evaluate(positions)
+    return np.array([function(position) for position in positions])
@@ -0,0 +1,482 @@
+import numpy as np
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from scipy.optimize import OptimizeResult, minimize
+from Objective import evaluate_population, parallelize, shutdown
+
+'''
+The messages of the reasons why an optimization stops.
+'''
+STOP_MESSAGES = {
+    "max_iterations": "Maximum number of iterations reached",
+    "max_evaluations": "Maximum number of evaluations reached",
+    "deadline": "Deadline reached",
+    "stagnation": "The best cost stopped improving",
+}
+
+'''
+Class StoppingCriteria.
+The criteria to stop an optimization before it uses all its iterations:
+a number of evaluations, a wall-clock deadline, and a stagnation window,
+that stops the optimization when the best cost has not improved by more
+than a tolerance during the last iterations.
+'''
+class StoppingCriteria():
+    '''
+    The constructor of the class.
+    Params:
+        - tolerance (optional): the improvement of the best cost below
+        which an iteration does not count as an improvement. It is 0
+        when only the window is given.
+        - window (optional): the number of iterations without improvement
+        after which the optimization stops. It is 10 when only the
+        tolerance is given.
+        - deadline (optional): the seconds after which the optimization stops.
+        - max_evaluations (optional): the evaluations after which the
+        optimization stops.
+    '''
+    def __init__(self, tolerance = None, window = None, deadline = None, max_evaluations = None) -> None:
+        self.tolerance = tolerance if tolerance is not None else 0
+        self.window = window if window else (10 if tolerance is not None else None)
+        self.deadline = deadline
+        self.max_evaluations = max_evaluations
+        self.start_time = time.perf_counter()
+        self.history = list()
+
+    '''
+    Method that starts the clock of the deadline and forgets the
+    history of the best costs.
+    '''
+    def start(self):
+        self.start_time = time.perf_counter()
+        self.history = list()
+
+    '''
+    Method that checks if the optimization has to stop.
+    Params:
+        - best_cost: the best cost found so far.
+        - evaluations: the evaluations spent so far.
+        - iteration (optional): True when the check closes an iteration,
+        so that the best cost is added to the stagnation window.
+    Returns:
+        - str: the reason to stop, a key of STOP_MESSAGES, or None to go on.
+    '''
+    def check(self, best_cost, evaluations, iteration = True):
+        if(self.max_evaluations is not None and evaluations >= self.max_evaluations):
+            return "max_evaluations"
+        if(self.deadline is not None and time.perf_counter() - self.start_time >= self.deadline):
+            return "deadline"
+        if(iteration and self.window):
+            self.history.append(best_cost)
+            if(len(self.history) > self.window and self.history[-self.window - 1] - best_cost <= self.tolerance):
+                return "stagnation"
+        return None
+
+    '''
+    Method that gets what is left of the evaluations and of the time,
+    for the work done inside an iteration, like a local search.
+    Params:
+        - evaluations: the evaluations spent so far.
+    Returns:
+        - int: the evaluations left, or None when they have no limit.
+        - float: the seconds left, or None when there is no deadline.
+    '''
+    def get_remaining(self, evaluations):
+        evaluations_left = None
+        if(self.max_evaluations is not None):
+            evaluations_left = max(self.max_evaluations - evaluations, 0)
+        seconds_left = None
+        if(self.deadline is not None):
+            seconds_left = max(self.deadline - (time.perf_counter() - self.start_time), 0)
+        return evaluations_left, seconds_left
+
+'''
+Exception raised inside an optimization to stop it.
+'''
+class StopOptimization(Exception):
+    pass
+'''
+Class Optimizer.
+The interface shared by the population based optimizers. An optimizer
+never evaluates the objective function by itself: ask returns a
+population of candidate points, one per row, and tell receives the cost
+of each of them, so the evaluations can be scheduled from outside, in
+batches, in parallel, cached or asynchronously. Every optimizer keeps
+the best point that it has been told and reports it in an
+OptimizeResult, like the ones of scipy.optimize.minimize.
+The optimizers implement propose, that builds the next population, and
+update, that moves the optimizer with the costs of that population.
+'''
+class Optimizer():
+    '''
+    The constructor of the class.
+    Params:
+        - max_iterations: the number of populations to evaluate.
+    '''
+    def __init__(self, max_iterations) -> None:
+        self.max_iterations = max_iterations
+        self.iterations = 0
+        self.evaluations = 0
+        self.best_position = None
+        self.best_cost = np.inf
+        self.candidates = None
+        self.function = None
+        self.stopping = None
+        self.stop_reason = None
+
+    '''
+    Method that builds the next population of candidate points.
+    Returns:
+        - numpy array: a matrix with one candidate point per row.
+    '''
+    def propose(self):
+        raise NotImplementedError
+
+    '''
+    Method that moves the optimizer with the costs of the last population.
+    Params:
+        - values: the cost of every point of the population.
+    '''
+    def update(self, values):
+        raise NotImplementedError
+
+    '''
+    Method that places known points in the initial population, in place
+    of its first random points. It must be called before the first ask.
+    The optimizers whose population is not kept in positions override it.
+    Params:
+        - points: a matrix with one point per row.
+    '''
+    def seed(self, points):
+        if(len(points) == 0):
+            return
+        points = np.asarray(points, dtype=float)[:len(self.positions)]
+        self.positions[:len(points)] = points
+
+    '''
+    Method that asks the optimizer for the next population to evaluate.
+    Returns:
+        - numpy array: a matrix with one candidate point per row.
+    '''
+    def ask(self):
+        self.candidates = np.asarray(self.propose(), dtype=float)
+        return self.candidates
+
+    '''
+    Method that tells the optimizer the costs of the last population
+    that it asked for.
+    Params:
+        - values: the cost of every point of the population, in order.
+    '''
+    def tell(self, values):
+        values = np.asarray(values, dtype=float)
+        self.evaluations += len(values)
+        self.iterations += 1
+        self.record(self.candidates, values)
+        self.update(values)
+
+    '''
+    Method that keeps the best of a set of evaluated points.
+    Params:
+        - positions: a matrix with one point per row.
+        - values: the cost of every point.
+    '''
+    def record(self, positions, values):
+        best = np.argmin(values)
+        if(values[best] < self.best_cost):
+            self.best_position = np.array(positions[best], dtype=float)
+            self.best_cost = values[best]
+
+    '''
+    Method that tells if the optimizer has used its iterations.
+    Returns:
+        - bool: True when there is no population left to evaluate.
+    '''
+    def finished(self):
+        return self.iterations >= self.max_iterations
+
+    '''
+    Method that gets the number of evaluations spent by the optimizer.
+    Returns:
+        - int: the number of evaluations.
+    '''
+    def get_evaluations(self):
+        return self.evaluations
+
+    '''
+    Method that checks the stopping criteria after an iteration.
+    Params:
+        - stopping: the StoppingCriteria, or None.
+    Returns:
+        - bool: True when the optimization has to stop.
+    '''
+    def should_stop(self, stopping):
+        if(stopping is not None):
+            self.stop_reason = stopping.check(self.best_cost, self.get_evaluations())
+        return self.stop_reason is not None
+
+    '''
+    Method that checks if a population would spend more evaluations
+    than the stopping criteria leave.
+    Params:
+        - stopping: the StoppingCriteria, or None.
+        - size: the number of points of the population.
+    Returns:
+        - bool: True when the population does not fit, and the
+        optimization has to stop.
+    '''
+    def exceeds(self, stopping, size):
+        if(stopping is None):
+            return False
+        evaluations_left, _ = stopping.get_remaining(self.get_evaluations())
+        if(evaluations_left is not None and size > evaluations_left):
+            self.stop_reason = "max_evaluations"
+        return self.stop_reason is not None
+
+    '''
+    Method that gets the result of the optimization.
+    Returns:
+        - OptimizeResult: the best point x, its cost fun, the number of
+        evaluations nfev, the number of populations nit and the reason
+        why the optimization stopped, in stop_reason and message.
+    '''
+    def get_result(self):
+        stop_reason = self.stop_reason if self.stop_reason else "max_iterations"
+        return OptimizeResult(x=self.best_position, fun=self.best_cost, nfev=self.get_evaluations(),
+            nit=self.iterations, success=self.best_position is not None,
+            stop_reason=stop_reason, message=STOP_MESSAGES[stop_reason])
+
+    '''
+    Method that runs the optimizer over an objective function, asking
+    for a population and evaluating it at once until it is finished.
+    Params:
+        - function (optional): the objective function. The function
+        given to the constructor is used when it is not given.
+        - executor (optional): a concurrent.futures executor to evaluate
+        the populations in parallel.
+        - n_workers (optional): the number of worker processes of a new
+        pool, when no executor is given.
+        - stopping (optional): the StoppingCriteria to stop before the
+        optimizer is finished, checked after every population. A
+        population that does not fit in the evaluations left is not
+        evaluated, and the criteria are kept in stopping, so that the
+        work done inside an iteration can keep within them too.
+    Returns:
+        - OptimizeResult: the result of the optimization.
+    '''
+    def optimize(self, function = None, executor = None, n_workers = None, stopping = None):
+        self.function = parallelize(function if function is not None else self.function, executor, n_workers)
+        self.stopping = stopping
+        if(stopping is not None):
+            stopping.start()
+        while(not self.finished()):
+            population = self.ask()
+            if(self.iterations > 0 and self.exceeds(stopping, len(population))):
+                break
+            self.tell(evaluate_population(self.function, population))
+            if(self.should_stop(stopping)):
+                break
+        shutdown(self.function)
+        return self.get_result()
+
+'''
+Class SteadyStateOptimizer.
+An optimizer that, instead of moving by generations, moves as soon as
+the cost of any single point arrives. ask_one returns one candidate
+point with a key and tell_one receives its cost, in any order, so the
+points can be evaluated asynchronously and the optimizer never waits
+for a whole population. ask and tell still work, on populations of
+batch_size points. Every point counts as an iteration.
+The optimizers implement propose_one and update_one, and may override
+ready to refuse new points while they wait for others.
+'''
+class SteadyStateOptimizer(Optimizer):
+    '''
+    The constructor of the class.
+    Params:
+        - max_evaluations: the number of points to evaluate.
+        - batch_size: the number of points of the populations of ask.
+    '''
+    def __init__(self, max_evaluations, batch_size) -> None:
+        super().__init__(max_evaluations)
+        self.max_evaluations = max_evaluations
+        self.batch_size = batch_size
+        self.asked = 0
+        self.keys = None
+
+    '''
+    Method that builds the next candidate point.
+    Returns:
+        - the key of the point, handed back to update_one.
+        - numpy array: the coordinates of the point.
+    '''
+    def propose_one(self):
+        raise NotImplementedError
+
+    '''
+    Method that moves the optimizer with the cost of a single point.
+    Params:
+        - key: the key of the point.
+        - position: the coordinates of the point.
+        - value: the cost of the point.
+    '''
+    def update_one(self, key, position, value):
+        raise NotImplementedError
+
+    '''
+    Method that tells if the optimizer can hand out another point.
+    Returns:
+        - bool: True when there is a point left to ask for.
+    '''
+    def ready(self):
+        return self.asked < self.max_evaluations
+
+    '''
+    Method that asks the optimizer for one point to evaluate.
+    Returns:
+        - the key of the point, to be handed back to tell_one.
+        - numpy array: the coordinates of the point.
+    '''
+    def ask_one(self):
+        self.asked += 1
+        key, position = self.propose_one()
+        return key, np.asarray(position, dtype=float)
+
+    '''
+    Method that tells the optimizer the cost of a point that it asked for.
+    Params:
+        - key: the key of the point, as returned by ask_one.
+        - position: the coordinates of the point.
+        - value: the cost of the point.
+    '''
+    def tell_one(self, key, position, value):
+        self.evaluations += 1
+        self.iterations += 1
+        self.record([position], [value])
+        self.update_one(key, position, value)
+
+    '''
+    Method that builds a population with the points that the optimizer
+    can hand out, up to batch_size of them.
+    Returns:
+        - numpy array: a matrix with one candidate point per row.
+    '''
+    def propose(self):
+        self.keys = list()
+        positions = list()
+        while(len(positions) < self.batch_size and self.ready()):
+            key, position = self.ask_one()
+            self.keys.append(key)
+            positions.append(position)
+        return np.array(positions)
+
+    '''
+    Method that tells the optimizer the costs of the last population
+    that it asked for, one point at a time.
+    Params:
+        - values: the cost of every point of the population, in order.
+    '''
+    def tell(self, values):
+        for key, position, value in zip(self.keys, self.candidates, np.asarray(values, dtype=float)):
+            self.tell_one(key, position, value)
+
+'''
+Function that runs a steady-state optimizer keeping a fixed number of
+evaluations in flight on an executor. Whenever an evaluation finishes,
+its cost is told to the optimizer and a new point is submitted in its
+place, so the workers never wait for the rest of a population.
+Params:
+    - optimizer: the SteadyStateOptimizer.
+    - function: the objective function, that evaluates a single point.
+    It must be picklable when the executor is a process pool.
+    - executor (optional): a concurrent.futures executor. When it is not
+    given, a process pool is created and shut down at the end.
+    - n_workers (optional): the number of worker processes of a new pool.
+    - in_flight (optional): the number of evaluations in flight. It is
+    the number of workers of the pool when it is not given.
+    - stopping (optional): the StoppingCriteria to stop before the
+    optimizer is finished, checked after every evaluation. The
+    evaluations that finished with the one that stops it are still
+    told, and the ones in flight are cancelled.
+Returns:
+    - OptimizeResult: the result of the optimization.
+'''
+def optimize_asynchronous(optimizer, function, executor = None, n_workers = None, in_flight = None, stopping = None):
+    owns_executor = executor is None
+    if(not n_workers and executor is not None):
+        n_workers = getattr(executor, '_max_workers', None)
+    n_workers = n_workers if n_workers else os.cpu_count()
+    executor = executor if executor else ProcessPoolExecutor(max_workers=n_workers)
+    in_flight = in_flight if in_flight else n_workers
+    pending = dict()
+    optimizer.stopping = stopping
+    if(stopping is not None):
+        stopping.start()
+    try:
+        while(optimizer.stop_reason is None):
+            while(len(pending) < in_flight and optimizer.ready()):
+                key, position = optimizer.ask_one()
+                pending[executor.submit(function, position)] = (key, position)
+            if(not pending):
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                key, position = pending.pop(future)
+                optimizer.tell_one(key, position, future.result())
+                if(optimizer.stop_reason is None):
+                    optimizer.should_stop(stopping)
+        for future in pending:
+            future.cancel()
+    finally:
+        if(owns_executor):
+            executor.shutdown(cancel_futures=True)
+    return optimizer.get_result()
+
+'''
+Function that runs scipy.optimize.minimize under stopping criteria. The
+evaluations and the deadline are checked on every evaluation of the
+function and the stagnation window on every iteration of the method.
+When a criterion is met, the result holds the best point evaluated.
+Params:
+    - function: the objective function. When jac is True, it returns
+    the cost together with its gradient.
+    - x0: the initial point.
+    - stopping (optional): the StoppingCriteria.
+    - **kwargs: the arguments of scipy.optimize.minimize.
+Returns:
+    - OptimizeResult: the result of the method, with the reason why it
+    stopped in stop_reason: a key of STOP_MESSAGES, or "converged" when
+    the method stopped by itself.
+'''
+def minimize_stopping(function, x0, stopping = None, **kwargs):
+    if(stopping is None):
+        res = minimize(function, x0, **kwargs)
+        res.stop_reason = "converged"
+        return res
+    jac = kwargs.get("jac") is True
+    best = OptimizeResult(x=np.array(x0, dtype=float), fun=np.inf, nfev=0, nit=0, success=True)
+    def objective(x):
+        value = function(x)
+        cost = value[0] if jac else value
+        best.nfev += 1
+        if(cost < best.fun):
+            best.x = np.array(x, dtype=float)
+            best.fun = cost
+        best.stop_reason = stopping.check(best.fun, best.nfev, iteration=False)
+        if(best.stop_reason is not None):
+            raise StopOptimization()
+        return value
+    def callback(*args):
+        best.nit += 1
+        best.stop_reason = stopping.check(best.fun, best.nfev)
+        if(best.stop_reason is not None):
+            raise StopOptimization()
+    stopping.start()
+    try:
+        res = minimize(objective, x0, callback=callback, **kwargs)
+        res.stop_reason = "converged"
+        return res
+    except StopOptimization:
+        best.message = STOP_MESSAGES[best.stop_reason]
+        return best
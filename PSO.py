@@ -1,132 +1,193 @@
-from random import uniform, random
-from math import e, sqrt,cos,pi
+from math import pi
+from collections import deque
 import numpy as np
+from Objective import parallelize
+from Optimizer import Optimizer, SteadyStateOptimizer
 '''
-Class Particle.
-A particle is an object that has a position, velocity and a "cost" of that position.
-Aditionally, a particle has a memory capable of storing the best position
-and the best cost that it has found.
+Class PSO.
+Class to run the particle swarm optimization with respect of the
+given function.
+The state of the swarm is stored as matrices with one row per particle:
+the current positions, the velocities and the best position found by
+every particle, together with the cost of each of them. The particles
+are updated all at once with whole array operations and the best
+position of the swarm is kept up to date as the costs arrive.
+The first population asked for is the initial swarm, and every next one
+is the swarm moved by its velocities.
 '''
-class Particle():
+class PSO(Optimizer):
     '''
     The constructor of the class.
-    Params: 
-        - init_position: A numpy array that contains the coordinates of the initial
-        position of the particle.
-        - init_best: The cost of the initial position.
-        - velocity: A numpy array that contains the velocities of the particle.
-        One entry for dimention.
-    '''
-    def __init__(self, init_position, init_best, velocity) -> None:
-        self.current_position = init_position
-        self.current_position_cost = init_best
-        self.best_position = init_position
-        self.best_position_cost = init_best
-        self.velocity = velocity
-
-    '''
-    Method to update the velocity of the particle.
-    Params: 
-        - c1, c2: social coeficients of the swarm.
-        - w: Constant to control the flying speed.
-        - best: the best position found by the swarm.
-    '''
-    def update_velocity(self, c1,c2,w,best):
-        r1 = random()
-        r2 = random()
-        self.velocity = w*self.velocity + c1*r1*(self.best_position-self.current_position) + c2*r2*(best-self.current_position)
+    Params:
+        - num_particles:  The number of particles in the swarm.
+        - num_params: The number of dimentions of the objective function.
+        - interval: An interval to grab the intial postion of the particles.
+        - function (optional): The objective function
+        - executor (optional): a concurrent.futures executor to evaluate
+        the population in parallel.
+        - n_workers (optional): the number of worker processes of a new
+        pool, when no executor is given.
+        - w (optional): Constant to control the flying speed.
+        - c1, c2 (optional): social coeficients of the swarm.
+        - num_iterations (optional): The number of the iterations for the PSO heuristic.
+    '''
+    def __init__(self,num_particles,num_params, interval, function = None, executor = None, n_workers = None,
+        w = 0.4, c1 = 0.1, c2 = 0.1, num_iterations = 50) -> None:
+        super().__init__(num_iterations + 1)
+        self.dimentions = num_params
+        self.function = parallelize(function, executor, n_workers) if function is not None else None
+        self.w = w
+        self.c1 = c1
+        self.c2 = c2
+        half = num_params // 2
+        self.positions = np.hstack([np.random.uniform(0, pi, (num_particles, half)),
+            np.random.uniform(0, 2*pi, (num_particles, num_params - half))])
+        self.velocities = np.random.random((num_particles, num_params))
+        self.costs = None
+        self.best_positions = None
+        self.best_costs = None
 
     '''
-    Method to update the position of the particle.
-    Params: 
-        - function: the cost function.
+    Method to build the next swarm: the initial one, or the swarm moved
+    according to the velocity of every particle.
+    Returns:
+        - numpy array: the positions of the particles.
     '''
-    def update_position(self,function):
-        self.current_position = self.current_position + self.velocity
-        self.current_position_cost = function(self.current_position)
-        if(self.current_position_cost < self.best_position_cost):
-            self.best_position = self.current_position
-            self.best_position_cost = self.current_position_cost
+    def propose(self):
+        if(self.costs is not None):
+            self.positions = self.positions + self.velocities
+        return self.positions
 
-'''
-Class Swarm.
-A swarm is a list of particles.
-The particles in the swarm are capable of identifying the best particle
-in the swarm.
-'''
-class Swarm():
-    '''
-    The constructor of the class.
     '''
-    def __init__(self) -> None:
-        self.particles = list()
+    Method to update the best position of every particle with the
+    costs of the swarm, and then their velocities.
+    Params:
+        - values: the cost of every particle.
+    '''
+    def update(self, values):
+        if(self.costs is None):
+            self.costs = values
+            self.best_positions = self.positions.copy()
+            self.best_costs = values.copy()
+            return
+        self.costs = values
+        improved = self.costs < self.best_costs
+        self.best_positions[improved] = self.positions[improved]
+        self.best_costs[improved] = self.costs[improved]
+        self.update_velocities(self.c1, self.c2, self.w)
 
     '''
-    Method to add a particle to the swarm.
-    Params: 
-        - particle: object of type particle that contains the particle to
-        be appended to the particles list.
+    Method to update the velocity of every particle.
+    Params:
+        - c1, c2: social coeficients of the swarm.
+        - w: Constant to control the flying speed.
     '''
-    def add_particle(self,particle):
-        self.particles.append(particle)
+    def update_velocities(self, c1, c2, w):
+        r1 = np.random.random((len(self.positions), 1))
+        r2 = np.random.random((len(self.positions), 1))
+        self.velocities = (w*self.velocities + c1*r1*(self.best_positions - self.positions)
+            + c2*r2*(self.best_position - self.positions))
 
     '''
     Method to get the best position of the swarm.
-    Return: 
-        - best_pos: a numpy array with the best position
+    Return:
+        - best_position: a numpy array with the best position
         of the swarm
     '''
     def get_gbest(self):
-        best_cost = self.particles[0].best_position_cost
-        best_pos = self.particles[0].best_position
-        for i in range(0,len(self.particles)):
-            if(self.particles[i].best_position_cost < best_cost):
-                best_cost = self.particles[i].best_position_cost
-                best_pos = self.particles[i].best_position
-        return best_pos
+        return self.best_position
+
+    '''
+    Method to run the PSO heuristic over the objective function.
+    On every iteration all the particles move first and the whole swarm
+    is evaluated as one population.
+    Params:
+        - c1, c2: social coeficients of the swarm.
+        - w: Constant to control the flying speed.
+        - num_iteration: The number of the iterations for the PSO heuristic.
+    Return:
+        - self.get_gbest(): The best solution found by the swarm.
+    '''
+    def run(self,w,c1,c2, num_iterations):
+        self.w = w
+        self.c1 = c1
+        self.c2 = c2
+        self.max_iterations = num_iterations + 1
+        self.optimize()
+        return self.get_gbest()
 
 '''
-Class PSO.
-Class to run the particle swarm optimization with respect of the
-given function.
+Class SteadyStatePSO.
+A particle swarm that moves every particle on its own, as soon as the
+cost of its last position arrives, with the best position of the swarm
+known at that moment. Every particle has at most one evaluation in
+flight, the particles are handed out in the order their costs arrive,
+and a slow evaluation only holds back its own particle.
 '''
-class PSO():
+class SteadyStatePSO(SteadyStateOptimizer):
     '''
     The constructor of the class.
-    Params: 
+    Params:
         - num_particles:  The number of particles in the swarm.
         - num_params: The number of dimentions of the objective function.
         - interval: An interval to grab the intial postion of the particles.
-        - function: The objective function
+        - w (optional): Constant to control the flying speed.
+        - c1, c2 (optional): social coeficients of the swarm.
+        - max_evaluations (optional): The number of positions to evaluate.
+    '''
+    def __init__(self, num_particles, num_params, interval, w = 0.4, c1 = 0.1, c2 = 0.1, max_evaluations = 1000) -> None:
+        super().__init__(max_evaluations, num_particles)
+        self.w = w
+        self.c1 = c1
+        self.c2 = c2
+        half = num_params // 2
+        self.positions = np.hstack([np.random.uniform(0, pi, (num_particles, half)),
+            np.random.uniform(0, 2*pi, (num_particles, num_params - half))])
+        self.velocities = np.random.random((num_particles, num_params))
+        self.best_positions = self.positions.copy()
+        self.best_costs = np.full(num_particles, np.inf)
+        self.idle = deque(range(0, num_particles))
+
     '''
-    def __init__(self,num_particles,num_params, interval, function) -> None:
-        def first_guess_linear(n):
-            theta = [uniform(0, pi) for _ in range(0,int(n/2))] + [uniform(0, 2*pi) for _ in range(0,int(n/2))]
-            return (theta)
-        self.swarm = Swarm()
-        self.dimentions = num_params
-        self.function = function
-        for _ in range(num_particles):
-            current_pos = first_guess_linear(num_params)
-            current_best = function(current_pos)
-            self.swarm.add_particle(Particle(current_pos,current_best,np.array([random() for _ in range(0,num_params)])))
+    Method that tells if there is a particle without an evaluation in flight.
+    Returns:
+        - bool: True when a particle can be handed out.
     '''
-    Method to run the PSO heuristic over the objective function.
-    Params: 
-        - c1, c2: social coeficients of the swarm.
-        - w: Constant to control the flying speed.
-        - num_iteration: The number of the iterations for the PSO heuristic.
-    Return: 
-        - self.swarm.get_gbest(): The best solution found by the swarm.
+    def ready(self):
+        return super().ready() and len(self.idle) > 0
+
     '''
-    def run(self,w,c1,c2, num_iterations):
-        for _ in range(0, num_iterations):
-            for particle in self.swarm.particles:
-                particle.update_position(self.function)
-                bestPosition = self.swarm.get_gbest()
-                particle.update_velocity(c1,c2,w, bestPosition)
-        return self.swarm.get_gbest()
+    Method that hands out the next idle particle, moved by its velocity
+    unless its initial position has not been evaluated yet.
+    Returns:
+        - int: the index of the particle.
+        - numpy array: the position of the particle.
+    '''
+    def propose_one(self):
+        particle = self.idle.popleft()
+        if(np.isfinite(self.best_costs[particle])):
+            self.positions[particle] = self.positions[particle] + self.velocities[particle]
+        return particle, self.positions[particle].copy()
+
+    '''
+    Method that updates the best position of a particle with its cost,
+    and then its velocity with the best position of the swarm.
+    Params:
+        - key: the index of the particle.
+        - position: the position of the particle.
+        - value: the cost of the position.
+    '''
+    def update_one(self, key, position, value):
+        first = not np.isfinite(self.best_costs[key])
+        if(value < self.best_costs[key]):
+            self.best_positions[key] = position
+            self.best_costs[key] = value
+        if(not first):
+            r1, r2 = np.random.random(2)
+            self.velocities[key] = (self.w*self.velocities[key] + self.c1*r1*(self.best_positions[key] - position)
+                + self.c2*r2*(self.best_position - position))
+        self.idle.append(key)
 
 #fx = lambda x : (x[0]**2 + x[1] - 11)**2 + (x[0] + x[1]**2 -7)**2
 #pso = PSO(num_particles=20,num_params=2, interval=[-5,5], function=fx)
-#pso.run(w=0.4,c1=0.1,c2=0.1, num_iterations=100)
\ No newline at end of file
+#pso.run(w=0.4,c1=0.1,c2=0.1, num_iterations=100)
@@ -0,0 +1,215 @@
+import numpy as np
+'''
+Function to get the cost of every cut of a graph at once.
+The basis state k encodes the cut in which node i lies on the side
+given by the bit i of k, the same qubit ordering used by the gates
+of the circuit.
+Params:
+    - edges: the edges of the graph.
+    - num_qubits: The number of qubits of the circuit.
+Returns:
+    - numpy array: an array whose entry k contains the cost
+    of the cut encoded by the basis state k.
+'''
+def get_cost_values(edges, num_qubits):
+    states = np.arange(2**num_qubits)
+    cost = np.zeros(2**num_qubits)
+    for i, j in edges:
+        cost -= ((states >> i) ^ (states >> j)) & 1
+    return cost
+
+'''
+Class QAOASimulator.
+A statevector simulator specialised to the QAOA circuit of a max cut
+instance. The cost layer is diagonal, so it is applied as an elementwise
+phase using the precomputed cost of every cut, and the mixer layer is
+applied as a single qubit RX rotation on each qubit of the state.
+Every method also accepts a batch of angles, in which case the states
+of the batch are stacked along the first axis and simulated together.
+'''
+class QAOASimulator():
+    '''
+    The constructor of the class.
+    Params:
+        - cost_values: a numpy array whose entry k contains the cost
+        of the cut encoded by the basis state k.
+        - num_qubits: The number of qubits of the circuit.
+        - observable (optional): a numpy array with the diagonal of the
+        measured operator. By default it is the cost itself.
+    '''
+    def __init__(self, cost_values, num_qubits, observable = None) -> None:
+        self.cost_values = cost_values
+        self.numqubits = num_qubits
+        self.observable = cost_values if observable is None else observable
+
+    '''
+    Method that applies the cost layer exp(-i*gamma*sum(ZZ)) to a state.
+    Since sum(ZZ) = |E| + 2*cost, the layer is the phase exp(-2i*gamma*cost)
+    up to a global phase.
+    Params:
+        - state: a complex numpy array with the amplitudes of the state.
+        - gamma: the angle of the cost layer, or an array with one
+        angle per state of the batch.
+    '''
+    def apply_phase(self, state, gamma):
+        state *= np.exp(-2j * np.multiply.outer(gamma, self.cost_values))
+
+    '''
+    Method that applies the mixer layer, a RX(2*beta) rotation on
+    every qubit, to a state.
+    Params:
+        - state: a complex numpy array with the amplitudes of the state.
+        - beta: the angle of the mixer layer, or an array with one
+        angle per state of the batch.
+    '''
+    def apply_mixer(self, state, beta):
+        beta = np.asarray(beta)
+        cos = np.cos(beta)[..., None, None]
+        sin = -1j * np.sin(beta)[..., None, None]
+        for i in range(0, self.numqubits):
+            view = state.reshape(state.shape[:-1] + (-1, 2, 2**i))
+            zero = view[..., 0, :].copy()
+            one = view[..., 1, :]
+            view[..., 0, :] = cos * zero + sin * one
+            view[..., 1, :] = sin * zero + cos * one
+
+    '''
+    Method that prepares the QAOA state for the given angles.
+    Params:
+        - gammas: the angles of the cost layers, with shape (p,) or
+        (k, p) for a batch of k states.
+        - betas: the angles of the mixer layers, with the same shape
+        as gammas.
+    Returns:
+        - numpy array: the amplitudes of the QAOA state, with shape
+        (2^n,) or (k, 2^n) for a batch.
+    '''
+    def get_state(self, gammas, betas):
+        gammas = np.asarray(gammas, dtype=float)
+        betas = np.asarray(betas, dtype=float)
+        state = np.full(gammas.shape[:-1] + (2**self.numqubits,), 2**(-self.numqubits/2), dtype=np.complex128)
+        for j in range(0, gammas.shape[-1]):
+            self.apply_phase(state, gammas[..., j])
+            self.apply_mixer(state, betas[..., j])
+        return state
+
+    '''
+    Method that gets the probability of every basis state.
+    Params:
+        - gammas: the angles of the cost layers.
+        - betas: the angles of the mixer layers.
+    Returns:
+        - numpy array: the probabilities of the basis states, one
+        row per state of the batch.
+    '''
+    def get_probabilities(self, gammas, betas):
+        state = self.get_state(gammas, betas)
+        return state.real**2 + state.imag**2
+
+    '''
+    Method that gets the expected value of the observable, by default
+    the cost, in the QAOA state.
+    Params:
+        - gammas: the angles of the cost layers.
+        - betas: the angles of the mixer layers.
+    Returns:
+        - float: the expected value, or a numpy array with one
+        expected value per state of the batch.
+    '''
+    def get_expectation(self, gammas, betas):
+        return np.dot(self.get_probabilities(gammas, betas), self.observable)
+
+    '''
+    Method that applies the sum of the X operators of every qubit,
+    the generator of the mixer layer, to a state.
+    Params:
+        - state: a complex numpy array with the amplitudes of the state.
+    Returns:
+        - numpy array: the amplitudes of sum(X) applied to the state.
+    '''
+    def apply_mixer_generator(self, state):
+        result = np.zeros_like(state)
+        for i in range(0, self.numqubits):
+            result.reshape(-1, 2, 2**i)[:] += state.reshape(-1, 2, 2**i)[:, ::-1, :]
+        return result
+
+    '''
+    Method that gets the expected value of the observable together with
+    its exact gradient, computed by adjoint differentiation: the state
+    is prepared once and then the layers are undone one by one while a
+    second state carries the observable backwards.
+    Params:
+        - gammas: the angles of the cost layers.
+        - betas: the angles of the mixer layers.
+    Returns:
+        - float: the expected value.
+        - numpy array: the derivatives with respect to the gammas.
+        - numpy array: the derivatives with respect to the betas.
+    '''
+    def get_expectation_and_gradient(self, gammas, betas):
+        state = self.get_state(gammas, betas)
+        adjoint = self.observable * state
+        expectation = np.vdot(state, adjoint).real
+        gradient_gammas = np.zeros(len(gammas))
+        gradient_betas = np.zeros(len(betas))
+        for j in range(len(gammas) - 1, -1, -1):
+            gradient_betas[j] = 2 * np.vdot(adjoint, -1j * self.apply_mixer_generator(state)).real
+            self.apply_mixer(state, -betas[j])
+            self.apply_mixer(adjoint, -betas[j])
+            gradient_gammas[j] = 2 * np.vdot(adjoint, -2j * self.cost_values * state).real
+            self.apply_phase(state, -gammas[j])
+            self.apply_phase(adjoint, -gammas[j])
+        return expectation, gradient_gammas, gradient_betas
+
+'''
+Class SymmetricQAOASimulator.
+A QAOASimulator that only stores half of the amplitudes. The cost of a
+cut does not change when every node moves to the other side, and neither
+the initial state, the cost layer nor the mixer layer break that
+symmetry, so the amplitude of every state equals the amplitude of its
+complement. Only the states in which the last qubit is 0 are stored,
+with the amplitude of the pair, so the stored state is normalized and
+its probabilities are those of the pairs. The cost layer is the phase
+of the cost of the stored states, and the mixer rotates the first n - 1
+qubits as usual and the last one by pairing every stored state with
+the stored complement of its partner, which is the reversed state.
+'''
+class SymmetricQAOASimulator(QAOASimulator):
+    '''
+    The constructor of the class.
+    Params:
+        - cost_values: a numpy array whose entry k contains the cost
+        of the cut encoded by the basis state k, for the 2^(n-1) states
+        in which the last qubit is 0.
+        - num_qubits: The number of qubits of the circuit.
+        - observable (optional): a numpy array with the diagonal of the
+        measured operator on the same states. By default it is the cost itself.
+    '''
+    def __init__(self, cost_values, num_qubits, observable = None) -> None:
+        super().__init__(cost_values, num_qubits - 1, observable)
+
+    '''
+    Method that applies the mixer layer, a RX(2*beta) rotation on
+    every qubit, to a state.
+    Params:
+        - state: a complex numpy array with the stored amplitudes.
+        - beta: the angle of the mixer layer, or an array with one
+        angle per state of the batch.
+    '''
+    def apply_mixer(self, state, beta):
+        super().apply_mixer(state, beta)
+        beta = np.asarray(beta)
+        cos = np.cos(beta)[..., None]
+        sin = -1j * np.sin(beta)[..., None]
+        state[:] = cos * state + sin * state[..., ::-1]
+
+    '''
+    Method that applies the sum of the X operators of every qubit,
+    the generator of the mixer layer, to a state.
+    Params:
+        - state: a complex numpy array with the stored amplitudes.
+    Returns:
+        - numpy array: the amplitudes of sum(X) applied to the state.
+    '''
+    def apply_mixer_generator(self, state):
+        return super().apply_mixer_generator(state) + state[..., ::-1]
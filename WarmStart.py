@@ -0,0 +1,225 @@
+import json
+import os
+import numpy as np
+'''
+Class WarmStartStore.
+A store of the optimal angles found for the max cut instances already
+solved, to start the optimization of new instances from them instead of
+from scratch. Every entry is keyed by the fingerprint of its graph, the
+number of nodes and the degree sequence, together with the p of the
+circuit. The angles of an instance are looked up in the entries of the
+most similar graphs, and the entries of a smaller p are extended to the
+p of the instance with extrapolate. The store can be kept in a JSON file.
+'''
+class WarmStartStore():
+    '''
+    The constructor of the class.
+    Params:
+        - path (optional): the JSON file where the entries are kept. The
+        entries in it are loaded when it exists.
+    '''
+    def __init__(self, path = None) -> None:
+        self.path = path
+        self.entries = list()
+        if(path is not None and os.path.exists(path)):
+            with open(path) as store:
+                self.entries = json.load(store)
+
+    '''
+    Method that gets the fingerprint of an instance.
+    Params:
+        - graph: The graph of the instance.
+        - p: The p value for the QAOA.
+    Returns:
+        - dict: the number of nodes, the sorted degree sequence and p.
+    '''
+    def get_fingerprint(self, graph, p):
+        return {
+            "num_nodes": graph.number_of_nodes(),
+            "degrees": sorted([int(degree) for _, degree in graph.degree()], reverse=True),
+            "p": p,
+        }
+
+    '''
+    Method that gets the distance between the graphs of two fingerprints:
+    the L1 distance between their normalized degree histograms plus the
+    relative difference between their number of nodes.
+    Params:
+        - fingerprint, other: the fingerprints.
+    Returns:
+        - float: the distance, 0 for graphs with the same degree sequence.
+    '''
+    def get_distance(self, fingerprint, other):
+        size = max(fingerprint["degrees"] + other["degrees"] + [0]) + 1
+        histogram = np.bincount(fingerprint["degrees"], minlength=size)/max(1, fingerprint["num_nodes"])
+        other_histogram = np.bincount(other["degrees"], minlength=size)/max(1, other["num_nodes"])
+        nodes = max(fingerprint["num_nodes"], other["num_nodes"], 1)
+        return np.sum(np.abs(histogram - other_histogram)) + abs(fingerprint["num_nodes"] - other["num_nodes"])/nodes
+
+    '''
+    Method that saves the optimal angles of an instance. An entry with the
+    same fingerprint is only replaced when the new angles have a lower cost.
+    Params:
+        - graph: The graph of the instance.
+        - p: The p value for the QAOA.
+        - gammas: the angles of the cost layers.
+        - betas: the angles of the mixer layers.
+        - cost (optional): the expected cost of the angles.
+    '''
+    def save(self, graph, p, gammas, betas, cost = None):
+        fingerprint = self.get_fingerprint(graph, p)
+        entry = {"fingerprint": fingerprint, "gammas": [float(gamma) for gamma in gammas],
+            "betas": [float(beta) for beta in betas], "cost": None if cost is None else float(cost)}
+        for i, other in enumerate(self.entries):
+            if(other["fingerprint"] == fingerprint):
+                if(cost is not None and (other["cost"] is None or cost < other["cost"])):
+                    self.entries[i] = entry
+                    self.write()
+                return
+        self.entries.append(entry)
+        self.write()
+
+    '''
+    Method that writes the entries to the JSON file of the store, if it has one.
+    '''
+    def write(self):
+        if(self.path is not None):
+            with open(self.path, "w") as store:
+                json.dump(self.entries, store)
+
+    '''
+    Method that gets the entries nearest to an instance, among the ones
+    whose p is not greater than the p of the instance. The entries are
+    sorted by the distance between the graphs and then by the difference
+    between their p and the p of the instance.
+    Params:
+        - graph: The graph of the instance.
+        - p: The p value for the QAOA.
+        - k (optional): the number of entries.
+    Returns:
+        - list: the nearest entries.
+    '''
+    def get_nearest(self, graph, p, k = 1):
+        fingerprint = self.get_fingerprint(graph, p)
+        candidates = [entry for entry in self.entries if entry["fingerprint"]["p"] <= p]
+        candidates.sort(key=lambda entry: (self.get_distance(fingerprint, entry["fingerprint"]), p - entry["fingerprint"]["p"]))
+        return candidates[:k]
+
+    '''
+    Method that gets initial angles for an instance from the nearest
+    entries, extended to the p of the instance.
+    Params:
+        - graph: The graph of the instance.
+        - p: The p value for the QAOA.
+        - k (optional): the number of entries.
+    Returns:
+        - list: a pair of numpy arrays, the gammas and the betas, per entry.
+    '''
+    def get_initial_angles(self, graph, p, k = 1):
+        angles = list()
+        for entry in self.get_nearest(graph, p, k):
+            theta = interleave(entry["gammas"], entry["betas"])
+            for _ in range(entry["fingerprint"]["p"], p):
+                theta = extrapolate(theta)
+            angles.append(deinterleave(theta))
+        return angles
+
+    '''
+    Method to get the number of entries of the store.
+    Returns:
+        - int: the number of entries.
+    '''
+    def __len__(self):
+        return len(self.entries)
+
+'''
+Function that builds the linear ramp of angles of a circuit of depth p,
+with the gammas on the even positions and the betas on the odd ones.
+Params:
+    - p: The p value for the QAOA.
+    - m1, m2 (optional): the largest gamma and beta.
+Returns:
+    - numpy array: the angles.
+'''
+def first_guess_linear(p,m1=0.5,m2=0.5):
+    theta=np.zeros([2*p])
+    for i in range(2*p):
+        if i % 2 ==0:
+            theta[i]=m1*(i+1)/(2*p)
+        else:
+            theta[i]=m2*(2*p-i)/(2*p)
+    return(theta)
+
+def x_ungerade(i,p):# for odd angles (gamma's)
+    return (i+0.5)/p
+    #return (i+0.25)/(p-0.75)   # unclear what is the best choice for x_i
+
+def x_gerade(i,p): # for even angles (beta's)
+    return (i+0.5)/p
+    #return i/p  # unclear what is the best choice for x_i
+
+'''
+Function that extends the angles of a circuit of depth p-1 to depth p by
+linear interpolation of the schedules of the gammas and of the betas,
+with the gammas on the even positions and the betas on the odd ones.
+The single gamma and beta of p = 1 are repeated for p = 2, and p = 1
+starts from the linear ramp.
+Params:
+    - theta: the angles of depth p-1, empty for p = 1.
+Returns:
+    - numpy array: the angles of depth p.
+'''
+def extrapolate(theta):
+    p=len(theta)//2+1
+    if p==1:
+        return(first_guess_linear(p))
+    if p==2: # A single point can not be interpolated, so it is kept constant
+        return(np.tile(np.asarray(theta, dtype=float), 2))
+    else:
+        theta2=np.zeros([2*p])
+        for i in range(2*p):
+            if i % 2 == 0:
+                x_func = x_ungerade
+                j=0
+            else:
+                x_func = x_gerade
+                j=1
+            x=x_func(i//2,p)
+            while x_func(j//2 +1,p-1)<x:
+                j+=2
+            while j//2>p-3:
+                j-=2
+            x1=x_func(j//2,p-1)
+            x2=x_func(j//2+1,p-1)
+            y1=theta[j]
+            y2=theta[j+2]
+            theta2[i]=((y1-y2)*x+x1*y2-y1*x2)/(x1-x2)
+            i+=1
+    return(theta2)
+
+'''
+Function that interleaves the gammas and the betas, in the layout used
+by extrapolate.
+Params:
+    - gammas: the angles of the cost layers.
+    - betas: the angles of the mixer layers.
+Returns:
+    - numpy array: the angles, with the gammas on the even positions.
+'''
+def interleave(gammas, betas):
+    theta = np.zeros(2*len(gammas))
+    theta[0::2] = gammas
+    theta[1::2] = betas
+    return theta
+
+'''
+Function that splits the angles in the layout used by extrapolate.
+Params:
+    - theta: the angles, with the gammas on the even positions.
+Returns:
+    - numpy array: the angles of the cost layers.
+    - numpy array: the angles of the mixer layers.
+'''
+def deinterleave(theta):
+    theta = np.asarray(theta, dtype=float)
+    return theta[0::2], theta[1::2]
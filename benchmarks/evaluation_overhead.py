@@ -0,0 +1,77 @@
+'''
+Benchmark of the per-call overhead of MaxCutSolver.get_expectation.
+It compares the previous evaluation path, which copied the circuit,
+bound the parameters, looked up the backend and (on the qasm backend)
+added the measurements on every call, with the current path, which
+transpiles the circuit once and only submits the parameter bindings.
+
+Usage:
+    python benchmarks/evaluation_overhead.py --nodes 10 --calls 50
+'''
+import argparse
+import os
+import sys
+import time
+import networkx as nx
+import numpy as np
+import qiskit.quantum_info as qi
+from qiskit import Aer, execute
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from MaxCutSolver import MaxCutSolver
+
+'''
+Function that evaluates the expectation the way get_expectation
+did before the circuit was transpiled once per solver.
+Params:
+    - solver: the MaxCutSolver.
+    - params: a list that contains the parameters for the circuit.
+Returns:
+    - float: the average value of the execution.
+'''
+def legacy_expectation(solver, params):
+    backend = Aer.get_backend(solver.backend)
+    qc = solver.circuit.copy()
+    qc = qc.bind_parameters(params)
+    if (solver.backend == 'qasm_simulator'):
+        qc.measure_all()
+        counts = execute(qc, shots=1000, backend=backend).result().get_counts()
+        return solver.get_counts_expectation(counts)
+    probabilities = qi.Statevector.from_instruction(qc).probabilities()
+    return np.dot(probabilities, solver.cost_values)
+
+'''
+Function that measures the average time of a call.
+Params:
+    - function: the function to time.
+    - params_list: the parameters of every call.
+Returns:
+    - float: the average time per call, in milliseconds.
+'''
+def time_calls(function, params_list):
+    start_time = time.perf_counter()
+    for params in params_list:
+        function(params)
+    return 1000*(time.perf_counter() - start_time)/len(params_list)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=10)
+    parser.add_argument("--degree", type=int, default=3)
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--max-p", type=int, default=6)
+    parser.add_argument("--backends", nargs="+", default=["statevector_simulator", "qasm_simulator"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    graph = nx.random_regular_graph(args.degree, args.nodes, seed=args.seed)
+    rng = np.random.default_rng(args.seed)
+    print("%-22s %3s %12s %12s %8s" % ("backend", "p", "before (ms)", "after (ms)", "speedup"))
+    for backend in args.backends:
+        for p in range(1, args.max_p + 1):
+            solver = MaxCutSolver(graph, args.nodes, backend, p)
+            params_list = rng.uniform(0, np.pi, (args.calls, 2*p))
+            before = time_calls(lambda params: legacy_expectation(solver, params), params_list)
+            after = time_calls(solver.get_expectation, params_list)
+            print("%-22s %3d %12.3f %12.3f %7.2fx" % (backend, p, before, after, before/after))
+
+if __name__ == "__main__":
+    main()
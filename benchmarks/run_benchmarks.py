@@ -0,0 +1,128 @@
+'''
+Benchmark suite that compares the optimize_* methods of MaxCutSolver.
+It sweeps graph families, graph sizes and values of p, runs every
+method under fixed seeds and records the wall time, the number of
+objective evaluations and of those spent in local searches, the peak
+memory and the approximation ratio of every run to a JSON file.
+
+Usage:
+    python benchmarks/run_benchmarks.py --families regular erdos_renyi \\
+        --sizes 6 8 --p 1 2 --output benchmark_results.json
+'''
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import networkx as nx
+import numpy as np
+from numpy import pi
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from MaxCutSolver import MaxCutSolver
+from ExactMaxCut import max_cut
+
+'''
+The methods of the suite, each one a function that receives the solver
+and returns the optimal parameters found.
+'''
+METHODS = {
+    "nelder-mead": lambda solver: solver.optimize_classic(method='Nelder-Mead').x,
+    "cobyla": lambda solver: solver.optimize_classic(method='COBYLA').x,
+    "slsqp": lambda solver: solver.optimize_classic(method='SLSQP').x,
+    "swarm": lambda solver: solver.optimize_swarm([0, pi]).x,
+    "bats": lambda solver: solver.optimize_bats([0, pi]).x,
+    "ants": lambda solver: solver.optimize_ants([0, pi]).x,
+    "bees": lambda solver: solver.optimize_bees([0, 2*pi]).x,
+}
+
+'''
+Function that builds a graph of a family.
+Params:
+    - family: the name of the family.
+    - size: the number of nodes.
+    - seed: the seed of the random graph.
+Returns:
+    - Graph: the graph.
+'''
+def get_graph(family, size, seed):
+    if (family == 'regular'):
+        return nx.random_regular_graph(3, size, seed=seed)
+    if (family == 'erdos_renyi'):
+        return nx.gnp_random_graph(size, 0.5, seed=seed)
+    if (family == 'barabasi_albert'):
+        return nx.barabasi_albert_graph(size, 2, seed=seed)
+    if (family == 'complete'):
+        return nx.complete_graph(size)
+    raise ValueError("Unknown graph family: " + str(family))
+
+'''
+Function that runs a method on a solver and measures it.
+Params:
+    - solver: the MaxCutSolver.
+    - method: the name of the method.
+    - seed: the seed of the optimizers.
+    - optimum: the cost of the maximum cut, or None if it is unknown.
+Returns:
+    - dict: the measurements of the run.
+'''
+def run_method(solver, method, seed, optimum):
+    random.seed(seed)
+    np.random.seed(seed)
+    evaluations = solver.evaluations
+    local_search_evaluations = solver.local_search_evaluations
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    params = METHODS[method](solver)
+    wall_time = time.perf_counter() - start_time
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    expectation = float(solver.get_expectation(params))
+    return {
+        "method": method,
+        "wall_time": wall_time,
+        "evaluations": solver.evaluations - evaluations,
+        "local_search_evaluations": solver.local_search_evaluations - local_search_evaluations,
+        "peak_memory": peak_memory,
+        "expectation": expectation,
+        "approximation_ratio": expectation/optimum if optimum else None,
+        "params": [float(param) for param in params],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--families", nargs="+", default=["regular", "erdos_renyi"])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[6, 8])
+    parser.add_argument("--p", nargs="+", type=int, default=[1, 2, 3])
+    parser.add_argument("--methods", nargs="+", default=list(METHODS), choices=list(METHODS))
+    parser.add_argument("--backend", default="statevector_simulator")
+    parser.add_argument("--engine", default="numpy")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args()
+    runs = list()
+    for family in args.families:
+        for size in args.sizes:
+            graph = get_graph(family, size, args.seed)
+            optimum = -max_cut(graph)[0]
+            for p in args.p:
+                solver = MaxCutSolver(graph, size, args.backend, p, engine=args.engine)
+                for method in args.methods:
+                    run = run_method(solver, method, args.seed, optimum)
+                    run.update({"family": family, "size": size, "edges": graph.number_of_edges(), "p": p, "optimum": optimum})
+                    runs.append(run)
+                    print("%-16s n=%-3d p=%-2d %-12s %8.3fs %7d evals ratio=%s" % (family, size, p, method,
+                        run["wall_time"], run["evaluations"], run["approximation_ratio"]))
+    results = {
+        "config": vars(args),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "runs": runs,
+    }
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2)
+
+if __name__ == "__main__":
+    main()